@@ -27,7 +27,23 @@ app.conf.beat_schedule = {
     },
     'send_cart_reminders': {
         'task': 'orders.tasks.send_cart_reminders',
-        'schedule': crontab(hour=9, minute=0, day_of_week='mon'),
+        'schedule': crontab(minute=0),
         # 'schedule': crontab(minute='*') #For Test
     },
+    'expire_unpaid_orders': {
+        'task': 'orders.tasks.expire_unpaid_orders_task',
+        'schedule': crontab(minute='*/10'),
+    },
+    'rollup_seller_sales': {
+        'task': 'orders.tasks.rollup_seller_sales',
+        'schedule': crontab(minute='*/5'),
+    },
+    'purge_expired_tokens': {
+        'task': 'accounts.tasks.purge_expired_tokens_task',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'purge_soft_deleted': {
+        'task': 'core.tasks.purge_soft_deleted_task',
+        'schedule': crontab(hour=4, minute=0),
+    },
 }
@@ -16,6 +16,7 @@ from pathlib import Path
 
 from celery.schedules import crontab
 from dotenv import load_dotenv
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -58,6 +59,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.TracingMiddleware',
+    'core.middleware.PrometheusMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -68,6 +73,41 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# share of requests that get a Server-Timing header and a metrics log line,
+# overridable per URL name, e.g. {'orders-export': 1.0, 'mycart-list': 0.01}
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', 0.1))
+REQUEST_METRICS_SAMPLE_RATES = {}
+
+# /metrics is open to staff sessions and to `Authorization: Bearer <token>` when set
+METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN', '')
+
+# spans for requests, tasks, DB, cache and HTTP calls; see core/tracing.py
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'False') == 'True'
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 1.0))
+TRACING_FILE = os.getenv('TRACING_FILE', str(BASE_DIR / 'traces.jsonl'))
+TRACING_COLLECTOR_URL = os.getenv('TRACING_COLLECTOR_URL', '')
+
+# staff can profile a request by sending a token from `manage.py profiling_token`
+# in the X-Profile header
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_ROOT = Path(os.getenv('PROFILING_ROOT', BASE_DIR / 'profiles'))
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+# at most one profile per staff user per interval, and this many per minute overall
+PROFILING_USER_INTERVAL = 30
+PROFILING_MAX_PER_MINUTE = 10
+PROFILING_KEEP = 200
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 CORS_ALLOW_ALL_ORIGINS = os.getenv('CORS_ALLOW_ALL_ORIGINS', 'True').lower() == 'true'
 
 ROOT_URLCONF = 'CustomyShop.urls'
@@ -211,12 +251,12 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
+        'core.throttles.AnonRateThrottle',
+        'core.throttles.UserRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '5/min',
@@ -227,6 +267,10 @@ REST_FRAMEWORK = {
 }
 
 
+# authenticated users are cached in Redis and, more briefly, in each process
+AUTH_USER_CACHE_SECONDS = int(os.getenv('AUTH_USER_CACHE_SECONDS', 60))
+AUTH_USER_LOCAL_CACHE_SECONDS = int(os.getenv('AUTH_USER_LOCAL_CACHE_SECONDS', 5))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(
         minutes=int(os.getenv('ACCESS_TOKEN_LIFETIME', 30))
@@ -240,6 +284,7 @@ SIMPLE_JWT = {
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.tokens.TokenRefreshSerializer',
 }
 
 
@@ -253,16 +298,68 @@ CELERY_TASK_SOFT_TIME_LIMIT = 20  # seconds
 CELERY_TASK_TIME_LIMIT = 30  # seconds
 CELERY_TASK_MAX_RETRIES = 3
 
+# OTP and transactional mail go to `realtime`, served by its own workers so
+# bulk jobs on `batch` can never delay them. Lower priority numbers run first.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_QUEUES = (
+    Queue('realtime', routing_key='realtime'),
+    Queue('default', routing_key='default'),
+    Queue('batch', routing_key='batch'),
+)
+CELERY_TASK_ROUTES = {
+    'accounts.tasks.send_otp_email_task': {'queue': 'realtime', 'priority': 0},
+    'orders.tasks.send_payment_success_email_task': {'queue': 'realtime', 'priority': 3},
+    'accounts.tasks.send_welcome_email_task': {'queue': 'realtime', 'priority': 6},
+    'orders.tasks.send_*_reminders*': {'queue': 'batch'},
+    'orders.tasks.expire_unpaid_orders_task': {'queue': 'batch'},
+    'orders.tasks.rollup_seller_sales': {'queue': 'batch'},
+    'products.tasks.*': {'queue': 'batch'},
+    'accounts.tasks.purge_expired_tokens_task': {'queue': 'batch'},
+    'core.tasks.*': {'queue': 'batch'},
+}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', 1))
+
+# soft-deleted rows of these models are hard-deleted after this many days;
+# only models nothing else points at belong here
+SOFT_DELETE_RETENTION_DAYS = {
+    'orders.CartItem': 30,
+    'products.ProductImage': 90,
+    'products.Comment': 90,
+    'products.Rating': 90,
+}
+
+# unpaid orders are cancelled and their stock released after this many minutes
+UNPAID_ORDER_EXPIRY_MINUTES = int(os.getenv('UNPAID_ORDER_EXPIRY_MINUTES', 60 * 24))
+
+# carts idle for this long get one reminder per period of inactivity
+CART_REMINDER_IDLE_HOURS = int(os.getenv('CART_REMINDER_IDLE_HOURS', 24))
+# how far back the first run (or a run after a lost watermark) looks for idle carts
+CART_REMINDER_LOOKBACK_HOURS = int(os.getenv('CART_REMINDER_LOOKBACK_HOURS', 24 * 7))
+
+# keys under LOCAL_PREFIXES are also kept in a per-process LRU, dropped on
+# every write through Redis pub/sub (see core/cache.py)
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'core.cache.TwoTierCache',
         'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/2'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'LOCAL_PREFIXES': ['catalog:', 'site_config:'],
+            'LOCAL_MAX_ENTRIES': 2000,
+            'LOCAL_TIMEOUT': 30,
         },
     }
 }
 
+CATALOG_CACHE_SECONDS = 5 * 60
+# max-age of the public Cache-Control on catalog reads; clients revalidate with ETag after it
+CATALOG_HTTP_MAX_AGE = 60
+
 
 SPECTACULAR_SETTINGS = {
     'TITLE': 'CoffeeShop API',
@@ -0,0 +1,85 @@
+import copy
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.cache import LocalLRUCache
+
+
+LOCAL_USER_CACHE_SIZE = 1024
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def _local_key(user_id):
+    # tokens carry the id as a string, signals pass the model's pk
+    return str(user_id)
+
+
+local_users = LocalLRUCache(LOCAL_USER_CACHE_SIZE)
+
+
+def get_cached_user(user_id):
+    user = local_users.get(_local_key(user_id))
+    if user is None:
+        user = cache.get(user_cache_key(user_id))
+        if user is None:
+            return None
+        local_users.set(_local_key(user_id), user, settings.AUTH_USER_LOCAL_CACHE_SECONDS)
+    # every request gets its own copy so views can't leak changes into the cache
+    return copy.copy(user)
+
+
+def cache_user(user):
+    user_id = getattr(user, api_settings.USER_ID_FIELD)
+    cache.set(user_cache_key(user_id), user, timeout=settings.AUTH_USER_CACHE_SECONDS)
+    local_users.set(
+        _local_key(user_id), copy.copy(user), settings.AUTH_USER_LOCAL_CACHE_SECONDS
+    )
+
+
+def invalidate_cached_user(user_id):
+    """Drops the user from Redis and from this process' LRU.
+
+    Other processes keep their local copy for at most
+    AUTH_USER_LOCAL_CACHE_SECONDS.
+    """
+    local_users.delete(_local_key(user_id))
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that resolves the user from a short-lived cache.
+
+    Users are looked up in an in-process LRU, then in the shared cache and
+    only then in the database. Entries are dropped whenever the user is
+    saved or deleted (see accounts.signals).
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        user = get_cached_user(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code='password_changed'
+            )
+        return user
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_address_is_default'),
+        ('stores', '0005_storeitem_active_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(condition=models.Q(('is_default', True), ('is_deleted', False)), fields=['user'], name='address_user_default_idx'),
+        ),
+    ]
@@ -52,6 +52,15 @@ class Address(BaseModel):
     postal_code = models.CharField(max_length=20)
     is_default = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user'],
+                condition=models.Q(is_deleted=False, is_default=True),
+                name='address_user_default_idx',
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if self.is_default:
             Address.objects.filter(user=self.user, is_default=True).update(is_default=False)
@@ -1,10 +1,11 @@
 from random import randint
 from django.core.cache import cache
-from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.tokens import TokenError
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
 from rest_framework.exceptions import ValidationError
 from .tasks import send_otp_email_task
+from .tokens import RefreshToken
 
 def create_otp(email, password, phone='', first_name='', last_name=''):
     otp_code = str(randint(100000, 999999))
@@ -1,10 +1,30 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .authentication import invalidate_cached_user
 from .models import CustomUser
 from .tasks import send_welcome_email_task
+from .tokens import blacklist_filter
 
 @receiver(post_save, sender=CustomUser)
 def send_welcome_email_signal(sender, instance, created, **kwargs):
     if created:
-        send_welcome_email_task.delay_on_commit(instance.pk)
\ No newline at end of file
+        send_welcome_email_task.delay_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user_signal(sender, instance, **kwargs):
+    # again after commit, in case a request re-cached the old row meanwhile
+    invalidate_cached_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_blacklist_filter_signal(sender, instance, created, **kwargs):
+    if created:
+        jti = instance.token.jti
+        transaction.on_commit(lambda: blacklist_filter.add([jti]))
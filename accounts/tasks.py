@@ -2,9 +2,10 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from .models import CustomUser
+from .tokens import blacklist_filter, purge_expired_tokens
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_welcome_email_task(user_id):
 
     user = CustomUser.objects.get(pk=user_id)
@@ -18,7 +19,7 @@ def send_welcome_email_task(user_id):
     return {'status': 'sent', 'user': user_id}
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_otp_email_task(email, otp_code):
         send_mail(
         subject='Your OTP Code',
@@ -26,3 +27,10 @@ def send_otp_email_task(email, otp_code):
         from_email = settings.DEFAULT_FROM_EMAIL,
         recipient_list=[email],
     )
+
+
+@shared_task
+def purge_expired_tokens_task():
+    purged = purge_expired_tokens()
+    blacklist_filter.rebuild()
+    return f'Purged {purged} expired tokens.'
@@ -0,0 +1,82 @@
+from unittest.mock import Mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import local_users
+from stores.admin import SellerRequestAdmin
+from stores.models import SellerRequest
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        self.user = User.objects.create_user(email="cached@test.com", password="pass123")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [q["sql"] for q in queries if '"accounts_customuser"' in q["sql"]]
+
+    def test_user_is_loaded_once(self):
+        url = reverse("myuser-myuser")
+
+        _, first = self.user_queries(url)
+        response, second = self.user_queries(url)
+
+        self.assertEqual(len(first), 1)
+        self.assertEqual(second, [])
+        self.assertEqual(response.data["email"], "cached@test.com")
+
+    def test_profile_update_invalidates_cache(self):
+        url = reverse("myuser-myuser")
+        self.client.get(url)
+
+        self.client.patch(url, {"first_name": "Renamed"}, format="json")
+
+        response, queries = self.user_queries(url)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data["first_name"], "Renamed")
+
+    def test_deactivated_user_is_rejected(self):
+        url = reverse("myuser-myuser")
+        self.client.get(url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_approved_seller_request_refreshes_role(self):
+        url = reverse("orders-export")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        SellerRequest.objects.create(user=self.user)
+        SellerRequestAdmin(SellerRequest, Mock()).approve_request(Mock(), SellerRequest.objects.all())
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_loses_read_access(self):
+        url = reverse("mycart-list")
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_cached_user_is_rejected(self):
+        self.user.is_active = False
+        cache.set(f"auth_user:{self.user.id}", self.user)
+
+        self.assertEqual(self.client.get(reverse("mycart-list")).status_code, status.HTTP_401_UNAUTHORIZED)
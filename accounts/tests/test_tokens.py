@@ -0,0 +1,139 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from accounts.tokens import RefreshToken, blacklist_filter, purge_expired_tokens
+
+User = get_user_model()
+
+
+class FakeRedis:
+    """Just enough of a redis client for the bitmap commands the filter uses."""
+
+    def __init__(self):
+        self.bitmaps = {}
+
+    def setbit(self, key, offset, value):
+        bits = self.bitmaps.setdefault(key, set())
+        (bits.add if value else bits.discard)(offset)
+
+    def getbit(self, key, offset):
+        return int(offset in self.bitmaps.get(key, ()))
+
+    def exists(self, key):
+        return int(key in self.bitmaps)
+
+    def delete(self, key):
+        self.bitmaps.pop(key, None)
+
+    def rename(self, src, dst):
+        self.bitmaps[dst] = self.bitmaps.pop(src)
+
+    def eval(self, script, numkeys, key, *positions):
+        # SETBITS_IF_EXISTS
+        if key not in self.bitmaps:
+            return 0
+        self.bitmaps[key].update(int(position) for position in positions)
+        return 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((getattr(self.client, name), args))
+
+    def execute(self):
+        return [method(*args) for method, args in self.calls]
+
+
+class PurgeExpiredTokensTests(TestCase):
+    def test_purges_expired_tokens_in_batches(self):
+        user = User.objects.create_user(email="tokens@test.com", password="pass123")
+        for _ in range(3):
+            RefreshToken.for_user(user).blacklist()
+        OutstandingToken.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        RefreshToken.for_user(user)
+
+        self.assertEqual(purge_expired_tokens(batch_size=2), 3)
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class BlacklistFilterTests(APITestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patcher = patch("accounts.tokens.get_redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(email="bloom@test.com", password="pass123")
+
+    def refresh(self, token):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("token_refresh"), {"refresh": str(token)})
+        blacklist_queries = [q for q in queries if "blacklistedtoken" in q["sql"] and "jti" in q["sql"]]
+        return response, blacklist_queries
+
+    def test_unknown_filter_falls_back_to_database(self):
+        response, queries = self.refresh(RefreshToken.for_user(self.user))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+    def test_filter_skips_query_for_live_tokens(self):
+        RefreshToken.for_user(self.user).blacklist()
+        self.assertEqual(blacklist_filter.rebuild(), 1)
+
+        response, queries = self.refresh(RefreshToken.for_user(self.user))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_blacklisted_token_is_rejected(self):
+        blacklist_filter.rebuild()
+        token = RefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+
+        response, queries = self.refresh(token)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(queries), 1)
+
+    def test_blacklisting_before_a_rebuild_keeps_the_filter_missing(self):
+        earlier = RefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            earlier.blacklist()
+            RefreshToken.for_user(self.user).blacklist()
+
+        self.assertFalse(self.redis.exists(blacklist_filter.key))
+        response, queries = self.refresh(earlier)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(queries), 1)
+
+    def test_blacklisting_after_the_filter_is_evicted_keeps_it_missing(self):
+        earlier = RefreshToken.for_user(self.user)
+        earlier.blacklist()
+        blacklist_filter.rebuild()
+        self.redis.delete(blacklist_filter.key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RefreshToken.for_user(self.user).blacklist()
+        response, _ = self.refresh(earlier)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,7 +1,9 @@
 from rest_framework.throttling import SimpleRateThrottle
 
+from core.throttles import RedisTokenBucketMixin
 
-class OtpRequestThrottle(SimpleRateThrottle):
+
+class OtpRequestThrottle(RedisTokenBucketMixin, SimpleRateThrottle):
     scope = 'otp_request'
 
     def get_cache_key(self, request, view):
@@ -14,7 +16,7 @@ class OtpRequestThrottle(SimpleRateThrottle):
         
         return self.cache_format % {'scope': self.scope, 'ident': ident}
 
-class OtpVerifyThrottle(SimpleRateThrottle):
+class OtpVerifyThrottle(RedisTokenBucketMixin, SimpleRateThrottle):
     scope = 'otp_verify'
 
     def get_cache_key(self, request, view):
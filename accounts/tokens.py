@@ -0,0 +1,136 @@
+import hashlib
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from core.redis import get_redis_client
+
+
+# EXISTS and SETBIT in one step, so an eviction can't slip in between
+SETBITS_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for _, position in ipairs(ARGV) do
+    redis.call('SETBIT', KEYS[1], position, 1)
+end
+return 1
+"""
+
+
+class BlacklistFilter:
+    """Bloom filter of blacklisted refresh token JTIs, kept as a Redis bitmap.
+
+    `might_contain` never gives a false negative while the filter exists,
+    so a miss lets a refresh skip the blacklist query. Before the first
+    rebuild, or without Redis, every JTI is a possible hit and the database
+    stays the source of truth.
+    """
+
+    key = 'token_blacklist:bloom'
+
+    def __init__(self, capacity, error_rate):
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+
+    def positions(self, jti):
+        digest = hashlib.blake2b(jti.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, jtis, key=None):
+        """Sets the bits for `jtis`, but only in a filter that already exists.
+
+        Setting bits on a missing key would create a partial filter that
+        reports every earlier blacklisted token as absent; a missing filter
+        stays missing (every JTI a possible hit) until `rebuild` fills it.
+        """
+        client = get_redis_client(cache)
+        if client is None:
+            return
+        positions = [position for jti in jtis for position in self.positions(jti)]
+        if positions:
+            client.eval(SETBITS_IF_EXISTS, 1, key or self.key, *positions)
+
+    def might_contain(self, jti):
+        client = get_redis_client(cache)
+        if client is None:
+            return True
+        pipe = client.pipeline(transaction=False)
+        pipe.exists(self.key)
+        for position in self.positions(jti):
+            pipe.getbit(self.key, position)
+        exists, *bits = pipe.execute()
+        return not exists or all(bits)
+
+    def rebuild(self, batch_size=5000):
+        """Rebuilds the filter from the blacklist and swaps it in atomically.
+
+        Bloom filters can't forget, so this is how purged tokens leave it.
+        Rows blacklisted while the copy is built are added again after the
+        swap.
+        """
+        client = get_redis_client(cache)
+        if client is None:
+            return 0
+        started_at = timezone.now()
+        building = f'{self.key}:building'
+        client.delete(building)
+        client.setbit(building, self.size - 1, 0)
+
+        jtis = BlacklistedToken.objects.order_by().values_list('token__jti', flat=True)
+        batch = []
+        added = 0
+        for jti in jtis.iterator(chunk_size=batch_size):
+            batch.append(jti)
+            if len(batch) == batch_size:
+                self.add(batch, key=building)
+                added += len(batch)
+                batch = []
+        self.add(batch, key=building)
+        added += len(batch)
+
+        client.rename(building, self.key)
+        self.add(
+            jtis.filter(blacklisted_at__gte=started_at - timedelta(minutes=5))
+        )
+        return added
+
+
+blacklist_filter = BlacklistFilter(capacity=1_000_000, error_rate=0.001)
+
+
+class RefreshToken(tokens.RefreshToken):
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+def purge_expired_tokens(batch_size=1000, max_batches=100):
+    """Deletes expired outstanding tokens and their blacklist rows in batches."""
+    now = timezone.now()
+    purged = 0
+    for _ in range(max_batches):
+        token_ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not token_ids:
+            break
+
+        BlacklistedToken.objects.filter(token_id__in=token_ids).delete()
+        OutstandingToken.objects.filter(id__in=token_ids).delete()
+        purged += len(token_ids)
+    return purged
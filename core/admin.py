@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import SiteConfiguration
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import RequestProfile, SiteConfiguration
 
 @admin.register(SiteConfiguration)
 class SiteConfigurationAdmin(admin.ModelAdmin):
@@ -12,4 +17,43 @@ class SiteConfigurationAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         # only allow one configuration instance
-        return not SiteConfiguration.objects.exists()
\ No newline at end of file
+        return not SiteConfiguration.objects.exists()
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "method", "path", "view_name", "status_code", "duration_ms", "user", "download")
+    list_filter = ("method", "status_code", "view_name")
+    search_fields = ("path", "view_name")
+    readonly_fields = ("created_at", "user", "method", "path", "view_name", "status_code", "duration_ms", "download", "summary")
+    exclude = ("file",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="core_requestprofile_download",
+            ),
+        ] + super().get_urls()
+
+    @admin.display(description="Profile")
+    def download(self, obj):
+        url = reverse("admin:core_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">{}.pstats</a>', url, obj.pk)
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        try:
+            stream = profile.file.open("rb")
+        except FileNotFoundError:
+            raise Http404
+        return FileResponse(stream, as_attachment=True, filename=f"profile-{profile.pk}.pstats")
@@ -5,3 +5,10 @@ from django.contrib import admin
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        import core.metrics
+        import core.signals
+        from core import tracing
+
+        tracing.install()
@@ -0,0 +1,237 @@
+import math
+import random
+import subprocess
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from accounts.models import Address
+from accounts.tokens import RefreshToken
+from orders.models import Cart
+from products.models import Product
+from stores.models import StoreItem
+
+from .datagen import WORDS
+
+SEARCH_TERMS = WORDS[:8]
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def count_queries():
+    """Yields a one-item list holding the number of queries run in the block."""
+    counter = [0]
+
+    def wrapper(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(wrapper))
+        yield counter
+
+
+@contextmanager
+def benchmark_environment():
+    """The test client's host and outbox, with DRF throttling switched off."""
+    try:
+        setup_test_environment()
+        owns_environment = True
+    except RuntimeError:
+        # already set up, e.g. when called from the test suite
+        owns_environment = False
+    throttle_classes = APIView.throttle_classes
+    APIView.throttle_classes = []
+    try:
+        yield
+    finally:
+        APIView.throttle_classes = throttle_classes
+        if owns_environment:
+            teardown_test_environment()
+
+
+class EndpointBenchmark:
+    """Drives the main API endpoints in-process through the full middleware
+    stack and records latency and query counts per endpoint.
+
+    Everything runs in one transaction that is rolled back at the end, so
+    checkouts and cart changes leave the dataset as it was and runs stay
+    comparable.
+    """
+
+    def __init__(self, user, requests=50, warmup=5, seed=None):
+        self.user = user
+        self.requests = requests
+        self.warmup = warmup
+        self.random = random.Random(seed)
+        self.client = APIClient()
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def scenarios(self):
+        """`(name, setup, call)`; `setup(i)` runs untimed and feeds `call`."""
+        return [
+            ('catalog_list', self.no_setup, self.catalog_list),
+            ('catalog_search', self.no_setup, self.catalog_search),
+            ('cart_list', self.no_setup, self.cart_list),
+            ('cart_add', self.pick_store_item, self.cart_add),
+            ('cart_update_quantity', self.add_to_cart, self.cart_update_quantity),
+            ('cart_remove_item', self.add_to_cart, self.cart_remove_item),
+            ('checkout', self.add_to_cart, self.checkout),
+            ('my_orders', self.no_setup, self.my_orders),
+        ]
+
+    def run(self):
+        results = {}
+        with benchmark_environment(), transaction.atomic():
+            self.prepare()
+            for name, setup, call in self.scenarios():
+                results[name] = self.measure(setup, call)
+            transaction.set_rollback(True)
+        return {
+            'commit': current_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'requests': self.requests,
+            'endpoints': results,
+        }
+
+    def measure(self, setup, call):
+        latencies, queries, errors = [], [], 0
+        for i in range(self.warmup + self.requests):
+            argument = setup(i)
+            with count_queries() as counter:
+                started = time.perf_counter()
+                response = call(argument)
+                elapsed = time.perf_counter() - started
+            if i < self.warmup:
+                continue
+            latencies.append(elapsed * 1000)
+            queries.append(counter[0])
+            if response.status_code >= 400:
+                errors += 1
+        return {
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'max_ms': round(max(latencies), 2),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+            'errors': errors,
+        }
+
+    def prepare(self):
+        self.store_item_ids = list(
+            StoreItem.objects.filter(stock__gte=self.warmup + self.requests * 4)
+            .values_list('id', flat=True)[:1000]
+        )
+        if not self.store_item_ids:
+            raise ValueError('No store items with enough stock; generate a dataset first.')
+        self.address = Address.objects.filter(user=self.user).first() or Address.objects.create(
+            user=self.user,
+            label='Benchmark',
+            address_line_1='Benchmark',
+            city='Tehran',
+            state='Tehran',
+            country='Iran',
+            postal_code='00000',
+        )
+        Cart.objects.get_or_create(user=self.user)
+        self.page_count = max(Product.objects.count() // api_settings.PAGE_SIZE, 1)
+
+    def no_setup(self, i):
+        return None
+
+    def pick_store_item(self, i):
+        return self.random.choice(self.store_item_ids)
+
+    def add_to_cart(self, i):
+        store_item_id = self.pick_store_item(i)
+        response = self.cart_add(store_item_id)
+        return next(
+            item['id'] for item in response.data['items'] if item['store_item_id'] == store_item_id
+        )
+
+    def catalog_list(self, _):
+        page = self.random.randrange(1, min(self.page_count, 100) + 1)
+        return self.client.get(reverse('product-list'), {'page': page})
+
+    def catalog_search(self, _):
+        return self.client.get(reverse('product-list'), {'search': self.random.choice(SEARCH_TERMS)})
+
+    def cart_list(self, _):
+        return self.client.get(reverse('mycart-list'))
+
+    def cart_add(self, store_item_id):
+        return self.client.post(
+            reverse('mycart-add-to-cart'), {'store_item_id': store_item_id}, format='json'
+        )
+
+    def cart_update_quantity(self, cart_item_id):
+        return self.client.patch(
+            reverse('mycart-update-quantity'),
+            {'cart_item_id': cart_item_id, 'quantity': 2},
+            format='json',
+        )
+
+    def cart_remove_item(self, cart_item_id):
+        return self.client.delete(reverse('mycart-remove-item', args=[cart_item_id]))
+
+    def checkout(self, _):
+        return self.client.post(
+            reverse('orders-checkout'), {'address_id': self.address.id}, format='json'
+        )
+
+    def my_orders(self, _):
+        return self.client.get(reverse('orders-my-orders'))
+
+
+def pick_benchmark_user(email=None):
+    """The given user, or the customer with the longest order history."""
+    users = get_user_model().objects.all()
+    if email:
+        return users.get(email=email)
+    return (
+        users.filter(role='customer')
+        .annotate(order_count=Count('order_customer'))
+        .order_by('-order_count')
+        .first()
+    )
+
+
+def compare_results(baseline, current):
+    """Rows of `(endpoint, metric, before, after)` for endpoints in both runs."""
+    rows = []
+    for name, metrics in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'queries_p50'):
+            rows.append((name, metric, before.get(metric), metrics[metric]))
+    return rows
@@ -0,0 +1,385 @@
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django_redis.cache import RedisCache
+
+from .metrics import CACHE_FILLS, CACHE_LOOKUPS
+from .redis import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+CLEAR_ALL = '*'
+
+
+class LocalLRUCache:
+    """A small thread-safe LRU whose entries expire after `timeout` seconds."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LocalTier:
+    """The per-process half of a two-tier cache: the LRU and its invalidation listener.
+
+    django.core.cache.caches builds a backend instance per thread, so this
+    state lives in `_local_tiers`, shared by every instance for the same
+    location and channel, and is dropped in a forked child.
+    """
+
+    def __init__(self, channel, max_entries):
+        self.channel = channel
+        self.local = LocalLRUCache(max_entries)
+        self.counts = Counter()
+        # bumped on every invalidation; a value read from the backend is
+        # only stored locally if no invalidation arrived in the meantime
+        self._generations = itertools.count()
+        self.generation = next(self._generations)
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def handle_invalidation(self, local_keys):
+        self.generation = next(self._generations)
+        self.counts['invalidations'] += 1
+        if CLEAR_ALL in local_keys:
+            self.local.clear()
+            return
+        for local_key in local_keys:
+            self.local.delete(local_key)
+
+    def ensure_listener(self, client):
+        listener = self._listener
+        if listener is not None and listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self.local.clear()
+            self._listener = threading.Thread(
+                target=self._listen, args=(client,), name=f'cache-invalidation-{self.channel}', daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self, client):
+        while True:
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # anything published while we weren't subscribed is lost
+                self.handle_invalidation([CLEAR_ALL])
+                for message in pubsub.listen():
+                    self.handle_invalidation(json.loads(message['data']))
+            except Exception:
+                logger.warning('Cache invalidation listener lost its connection', exc_info=True)
+                time.sleep(1)
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+def get_local_tier(location, channel, max_entries):
+    key = (str(location), channel)
+    tier = _local_tiers.get(key)
+    if tier is not None:
+        return tier
+    with _local_tiers_lock:
+        tier = _local_tiers.get(key)
+        if tier is None:
+            tier = _local_tiers[key] = LocalTier(channel, max_entries)
+        return tier
+
+
+def _reset_local_tiers():
+    # a forked child inherits the entries but not the listener threads
+    global _local_tiers_lock
+    _local_tiers.clear()
+    _local_tiers_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_local_tiers)
+
+
+class TwoTierCacheMixin:
+    """Serves keys under LOCAL_PREFIXES from a per-process LRU in front of the backend.
+
+    Writes to such keys drop the local entry and publish the key on a
+    Redis channel; every process listens and drops its own copy. Local
+    entries also expire after LOCAL_TIMEOUT seconds, which bounds
+    staleness if a message is missed while the listener reconnects.
+    Keys outside LOCAL_PREFIXES behave exactly like the backend.
+    """
+
+    def __init__(self, server, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS', {}))
+        self.local_prefixes = tuple(options.pop('LOCAL_PREFIXES', ()))
+        self.local_timeout = options.pop('LOCAL_TIMEOUT', 30)
+        self.channel = options.pop('INVALIDATION_CHANNEL', 'cache:invalidate')
+        max_entries = options.pop('LOCAL_MAX_ENTRIES', 1000)
+        params['OPTIONS'] = options
+        super().__init__(server, params)
+        self.location = server
+        self.max_entries = max_entries
+
+    @property
+    def tier(self):
+        # looked up on use, so an instance that outlives a fork gets the child's tier
+        return get_local_tier(self.location, self.channel, self.max_entries)
+
+    @property
+    def local(self):
+        return self.tier.local
+
+    @property
+    def counts(self):
+        return self.tier.counts
+
+    def is_local(self, key):
+        return key.startswith(self.local_prefixes)
+
+    def stats(self):
+        tier = self.tier
+        return {**tier.counts, 'local_entries': len(tier.local)}
+
+    def _count(self, tier, result, amount=1):
+        self.counts[f'{tier}_{result}'] += amount
+        CACHE_LOOKUPS.labels(tier, result).inc(amount)
+
+    # reads
+
+    def get(self, key, default=None, version=None, **kwargs):
+        if not self.is_local(key):
+            return super().get(key, default, version, **kwargs)
+        self._ensure_listener()
+        tier = self.tier
+        local_key = self.make_key(key, version)
+        entry = tier.local.get(local_key)
+        if entry is not None:
+            self._count('local', 'hit')
+            return entry[0]
+
+        self._count('local', 'miss')
+        generation = tier.generation
+        value = super().get(key, _MISSING, version, **kwargs)
+        if value is _MISSING:
+            self._count('backend', 'miss')
+            return default
+        self._count('backend', 'hit')
+        if generation == tier.generation:
+            tier.local.set(local_key, (value,), self.local_timeout)
+        return value
+
+    def get_many(self, keys, version=None, **kwargs):
+        keys = list(keys)
+        tier = self.tier
+        found = {}
+        remote = []
+        for key in keys:
+            entry = tier.local.get(self.make_key(key, version)) if self.is_local(key) else None
+            if entry is None:
+                remote.append(key)
+            else:
+                found[key] = entry[0]
+        local_keys = [key for key in keys if self.is_local(key)]
+        if local_keys:
+            self._ensure_listener()
+            self._count('local', 'hit', len(found))
+            self._count('local', 'miss', len(local_keys) - len(found))
+        if not remote:
+            return found
+
+        generation = tier.generation
+        values = super().get_many(remote, version=version, **kwargs)
+        if generation == tier.generation:
+            for key, value in values.items():
+                if self.is_local(key):
+                    tier.local.set(self.make_key(key, version), (value,), self.local_timeout)
+        found.update(values)
+        return found
+
+    # writes
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, **kwargs):
+        result = super().set(key, value, timeout, version, **kwargs)
+        self.invalidate([key], version)
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, **kwargs):
+        result = super().add(key, value, timeout, version, **kwargs)
+        if result:
+            self.invalidate([key], version)
+        return result
+
+    def delete(self, key, version=None, **kwargs):
+        result = super().delete(key, version, **kwargs)
+        self.invalidate([key], version)
+        return result
+
+    def incr(self, key, delta=1, version=None, **kwargs):
+        result = super().incr(key, delta, version, **kwargs)
+        self.invalidate([key], version)
+        return result
+
+    def decr(self, key, delta=1, version=None, **kwargs):
+        result = super().decr(key, delta, version, **kwargs)
+        self.invalidate([key], version)
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, **kwargs):
+        result = super().set_many(data, timeout, version, **kwargs)
+        self.invalidate(list(data), version)
+        return result
+
+    def delete_many(self, keys, version=None, **kwargs):
+        keys = list(keys)
+        result = super().delete_many(keys, version, **kwargs)
+        self.invalidate(keys, version)
+        return result
+
+    def clear(self):
+        result = super().clear()
+        self.handle_invalidation([CLEAR_ALL])
+        self.publish([CLEAR_ALL])
+        return result
+
+    # invalidation
+
+    def invalidate(self, keys, version=None):
+        local_keys = [self.make_key(key, version) for key in keys if self.is_local(key)]
+        if local_keys:
+            self.handle_invalidation(local_keys)
+            self.publish(local_keys)
+
+    def handle_invalidation(self, local_keys):
+        self.tier.handle_invalidation(local_keys)
+
+    def publish(self, local_keys):
+        client = get_redis_client(self)
+        if client is not None:
+            client.publish(self.channel, json.dumps(local_keys))
+
+    def _ensure_listener(self):
+        client = get_redis_client(self)
+        if client is not None:
+            self.tier.ensure_listener(client)
+
+
+class TwoTierCache(TwoTierCacheMixin, RedisCache):
+    """django-redis with an in-process LRU for LOCAL_PREFIXES keys."""
+
+
+# Stampede protection
+
+# `expires_at` is the logical expiry; the entry itself lives `stale` seconds
+# longer so it can be served while one caller recomputes it. `delta` is how
+# long the last computation took, which scales the early refresh.
+CachedValue = namedtuple('CachedValue', ['value', 'expires_at', 'delta'])
+
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+
+
+def get_or_compute(key, compute, timeout, stale=None, beta=1.0, wait=2.0, cache=None):
+    """The cached value for `key`, computing it with `compute()` at most once at a time.
+
+    - Single flight: only the caller holding the `lock:<key>` cache lock
+      (a Redis SET NX with django-redis) runs `compute`. On a cold key the
+      others poll for up to `wait` seconds and only compute themselves if
+      the holder is too slow.
+    - Early refresh (XFetch): a fresh entry is recomputed with a
+      probability that rises towards its expiry and with its compute time,
+      so hot keys are usually refreshed before they expire at all.
+    - Stale while revalidate: an expired entry is kept for `stale` more
+      seconds (default: `timeout`) and served while the lock holder
+      recomputes it.
+
+    A `compute()` result of None is returned but not cached.
+    """
+    cache = cache or default_cache
+    stale = timeout if stale is None else stale
+    entry = cache.get(key)
+    if not isinstance(entry, CachedValue):
+        entry = None
+
+    if entry is not None:
+        # -log(random()) is exponential with mean 1, so the window scales with delta * beta
+        early = entry.delta * beta * -math.log(1.0 - random.random())
+        if time.time() + early < entry.expires_at:
+            CACHE_FILLS.labels('fresh').inc()
+            return entry.value
+
+    lock_key = f'lock:{key}'
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        try:
+            CACHE_FILLS.labels('early' if entry and time.time() < entry.expires_at else 'computed').inc()
+            return _compute_and_store(cache, key, compute, timeout, stale)
+        finally:
+            cache.delete(lock_key)
+
+    if entry is not None:
+        CACHE_FILLS.labels('stale').inc()
+        return entry.value
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if isinstance(entry, CachedValue):
+            CACHE_FILLS.labels('waited').inc()
+            return entry.value
+        if cache.get(lock_key) is None:
+            # the holder gave up (compute raised or returned None)
+            break
+    CACHE_FILLS.labels('unlocked').inc()
+    return _compute_and_store(cache, key, compute, timeout, stale)
+
+
+def _compute_and_store(cache, key, compute, timeout, stale):
+    started = time.perf_counter()
+    value = compute()
+    delta = time.perf_counter() - started
+    if value is not None:
+        cache.set(key, CachedValue(value, time.time() + timeout, delta), timeout=timeout + stale)
+    return value
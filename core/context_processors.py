@@ -1,4 +1,7 @@
 from .models import SiteConfiguration
 
 def site_config(request):
-    return {'site_config': SiteConfiguration.get_solo()}
\ No newline at end of file
+    # admin pages render many templates per request, load the config once
+    if not hasattr(request, '_site_config'):
+        request._site_config = SiteConfiguration.get_cached()
+    return {'site_config': request._site_config}
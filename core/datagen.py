@@ -0,0 +1,234 @@
+import random
+from array import array
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Address
+from orders.models import Cart, CartItem, Order, OrderItem, Payment
+from products.models import Category, Product, ProductImage
+from stores.models import Store, StoreItem
+
+DEFAULT_BATCH_SIZE = 2000
+# every generated user can log in with this password
+PASSWORD = 'datagen-pass'
+WORDS = (
+    'wireless', 'organic', 'classic', 'compact', 'premium', 'smart', 'vintage',
+    'portable', 'leather', 'ceramic', 'steel', 'cotton', 'mouse', 'lamp', 'shoe',
+    'kettle', 'jacket', 'phone', 'chair', 'watch', 'bottle', 'camera', 'desk',
+)
+HISTORY_DAYS = 730
+
+
+class DatasetGenerator:
+    """Bulk-inserts a synthetic shop: a category tree, sellers with stores,
+    a catalog of products and store items, and customers with carts and
+    order histories.
+
+    Rows are written in `batch_size` chunks, one transaction per chunk, and
+    emails carry a per-run tag so generating twice never collides.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, seed=None, log=None):
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.tag = uuid4().hex[:8]
+        self.now = timezone.now()
+        self.log = log or (lambda message: None)
+        self.counts = Counter()
+        self.password = make_password(PASSWORD)
+
+    def chunks(self, total, size=None):
+        size = size or self.batch_size
+        for start in range(0, total, size):
+            yield start, min(size, total - start)
+
+    def create(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.counts[model._meta.label] += len(objs)
+        return objs
+
+    def words(self, count):
+        return ' '.join(self.random.choice(WORDS) for _ in range(count))
+
+    def price(self):
+        return Decimal(self.random.randrange(100, 50000)) / 100
+
+    def users(self, start, count, role):
+        User = get_user_model()
+        return self.create(User, [
+            User(
+                email=f'{self.tag}-{role}-{start + number}@example.com',
+                password=self.password,
+                role=role,
+                is_seller=role == 'seller',
+            )
+            for number in range(count)
+        ])
+
+    def categories(self, fanout, depth):
+        """Creates `fanout` roots, each `depth` levels deep; returns the leaf ids."""
+        parents = [None]
+        for level in range(depth):
+            with transaction.atomic():
+                level_categories = self.create(Category, [
+                    Category(
+                        name=f'{self.words(2).title()} {level}-{number}',
+                        description=self.words(8),
+                        parent_id=parent,
+                    )
+                    for parent in parents
+                    for number in range(fanout)
+                ])
+            parents = [category.pk for category in level_categories]
+            self.log(f'Categories level {level + 1}: {len(parents)}')
+        return parents
+
+    def stores(self, count):
+        store_ids = []
+        for start, size in self.chunks(count):
+            with transaction.atomic():
+                sellers = self.users(start, size, 'seller')
+                stores = self.create(Store, [
+                    Store(name=f'{self.words(1).title()} Store {start + number}', seller=seller)
+                    for number, seller in enumerate(sellers)
+                ])
+            store_ids.extend(store.pk for store in stores)
+        return store_ids
+
+    def catalog(self, count, category_ids, store_ids, offers, images):
+        """Creates `count` products with `offers` store items each; returns the store item ids."""
+        store_item_ids = array('q')
+        for start, size in self.chunks(count):
+            with transaction.atomic():
+                products = self.create(Product, [
+                    Product(
+                        name=f'{self.words(3).title()} {start + number}',
+                        description=self.words(20),
+                        category_id=self.random.choice(category_ids),
+                    )
+                    for number in range(size)
+                ])
+                self.create(ProductImage, [
+                    ProductImage(product=product, image=f'product/datagen-{number}.png')
+                    for product in products
+                    for number in range(images)
+                ])
+                store_items = self.create(StoreItem, [
+                    StoreItem(
+                        product=product,
+                        store_id=store_id,
+                        price=self.price(),
+                        stock=self.random.randrange(0, 1000),
+                    )
+                    for product in products
+                    for store_id in self.random.sample(store_ids, min(offers, len(store_ids)))
+                ])
+            store_item_ids.extend(item.pk for item in store_items)
+            self.log(f'Products: {start + size}/{count}')
+        return store_item_ids
+
+    def customers(self, count, store_item_ids, orders_per_user, items_per_order, cart_items):
+        per_user = 1 + orders_per_user * (items_per_order + 2) + cart_items
+        chunk = max(1, self.batch_size // per_user)
+        for start, size in self.chunks(count, chunk):
+            with transaction.atomic():
+                users = self.users(start, size, 'customer')
+                addresses = self.create(Address, [
+                    Address(
+                        user=user,
+                        label='Home',
+                        address_line_1=f'{self.random.randrange(1, 999)} {self.words(1).title()} St',
+                        city='Tehran',
+                        state='Tehran',
+                        country='Iran',
+                        postal_code=str(self.random.randrange(10000, 99999)),
+                        is_default=True,
+                    )
+                    for user in users
+                ])
+                self.cart_rows(users, store_item_ids, cart_items)
+                self.order_rows(addresses, store_item_ids, orders_per_user, items_per_order)
+            self.log(f'Customers: {start + size}/{count}')
+
+    def cart_rows(self, users, store_item_ids, cart_items):
+        cart_items = min(cart_items, len(store_item_ids))
+        carts = self.create(Cart, [
+            Cart(user=user, item_count=cart_items, last_activity_at=self.now)
+            for user in users
+        ])
+        self.create(CartItem, [
+            CartItem(cart=cart, store_item_id=store_item_ids[index], quantity=self.random.randrange(1, 4))
+            for cart in carts
+            for index in self.random.sample(range(len(store_item_ids)), cart_items)
+        ])
+
+    def order_rows(self, addresses, store_item_ids, orders_per_user, items_per_order):
+        statuses = [status for status, _ in Order.ORDER_STATUS]
+        orders = self.create(Order, [
+            Order(
+                customer_id=address.user_id,
+                address=address,
+                status=self.random.choice(statuses),
+                total_price=self.price() * items_per_order,
+            )
+            for address in addresses
+            for _ in range(orders_per_user)
+        ])
+        # created_at is auto_now_add, so spread the history out afterwards
+        for order in orders:
+            order.created_at = self.now - timedelta(
+                minutes=self.random.randrange(HISTORY_DAYS * 24 * 60)
+            )
+        Order.objects.bulk_update(orders, ['created_at'], batch_size=self.batch_size)
+        self.create(OrderItem, [
+            OrderItem(
+                order=order,
+                store_item_id=self.random.choice(store_item_ids),
+                quantity=self.random.randrange(1, 4),
+                price=self.price(),
+            )
+            for order in orders
+            for _ in range(items_per_order)
+        ])
+        self.create(Payment, [
+            Payment(
+                order=order,
+                amount=order.total_price,
+                status=Payment.SUCCESS if order.status in (Order.PROCESSING, Order.DELIVERED) else Payment.PENDING,
+            )
+            for order in orders
+        ])
+
+
+def generate_dataset(
+    *,
+    users,
+    products,
+    stores,
+    category_fanout,
+    category_depth,
+    offers_per_product,
+    images_per_product,
+    orders_per_user,
+    items_per_order,
+    cart_items,
+    batch_size=DEFAULT_BATCH_SIZE,
+    seed=None,
+    log=None,
+):
+    generator = DatasetGenerator(batch_size=batch_size, seed=seed, log=log)
+    category_ids = generator.categories(category_fanout, category_depth)
+    store_ids = generator.stores(stores)
+    store_item_ids = generator.catalog(
+        products, category_ids, store_ids, offers_per_product, images_per_product
+    )
+    if store_item_ids:
+        generator.customers(users, store_item_ids, orders_per_user, items_per_order, cart_items)
+    return generator.counts
@@ -0,0 +1,142 @@
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+_MISSING = object()
+
+_current = ContextVar('request_metrics', default=None)
+# set inside get_many, whose base implementation calls get() per key
+_in_get_many = ContextVar('in_cache_get_many', default=False)
+
+
+class RequestMetrics:
+    """Counters for the DB, cache and HTTP work done while handling one request."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.http_calls = 0
+        self.http_time = 0.0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self):
+        return {
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_ms': round(self.cache_time * 1000, 2),
+            'http_calls': self.http_calls,
+            'http_ms': round(self.http_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+        }
+
+
+def start():
+    """Starts collecting for the current context, returns a token for `stop`."""
+    return _current.set(RequestMetrics())
+
+
+def stop(token):
+    metrics = _current.get()
+    _current.reset(token)
+    return metrics
+
+
+def current():
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """`connection.execute_wrapper` hook counting queries and their time."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def _instrument_cache_class(cls):
+    if cls.__dict__.get('_metrics_instrumented'):
+        return
+    original_get = cls.get
+    original_get_many = cls.get_many
+
+    def get(self, key, default=None, version=None, **kwargs):
+        metrics = _current.get()
+        if metrics is None or _in_get_many.get():
+            return original_get(self, key, default, version, **kwargs)
+        started = time.perf_counter()
+        value = original_get(self, key, _MISSING, version, **kwargs)
+        metrics.cache_time += time.perf_counter() - started
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+
+    def get_many(self, keys, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return original_get_many(self, keys, *args, **kwargs)
+        keys = list(keys)
+        started = time.perf_counter()
+        token = _in_get_many.set(True)
+        try:
+            values = original_get_many(self, keys, *args, **kwargs)
+        finally:
+            _in_get_many.reset(token)
+        metrics.cache_time += time.perf_counter() - started
+        metrics.cache_hits += len(values)
+        metrics.cache_misses += len(keys) - len(values)
+        return values
+
+    cls.get = get
+    cls.get_many = get_many
+    cls._metrics_instrumented = True
+
+
+def _instrument_requests():
+    try:
+        import requests
+    except ImportError:
+        return
+    session_class = requests.Session
+    if session_class.__dict__.get('_metrics_instrumented'):
+        return
+    original_send = session_class.send
+
+    def send(self, request, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return original_send(self, request, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original_send(self, request, **kwargs)
+        finally:
+            metrics.http_calls += 1
+            metrics.http_time += time.perf_counter() - started
+
+    session_class.send = send
+    session_class._metrics_instrumented = True
+
+
+def install():
+    """Hooks the configured cache backends and `requests` once per process."""
+    for config in settings.CACHES.values():
+        _instrument_cache_class(import_string(config['BACKEND']))
+    _instrument_requests()
@@ -0,0 +1,61 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import EndpointBenchmark, compare_results, pick_benchmark_user
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the main API endpoints and write p50/p95 latency and query counts as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark.json', help='Where to write the results.')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint.')
+        parser.add_argument('--user', help='Email of the customer to run as (default: longest order history).')
+        parser.add_argument('--compare', help='A previous results file to compare against.')
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        try:
+            user = pick_benchmark_user(options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist.')
+        if user is None:
+            raise CommandError('No customers found; run generate_dataset first.')
+
+        benchmark = EndpointBenchmark(
+            user, requests=options['requests'], warmup=options['warmup'], seed=options['seed']
+        )
+        try:
+            results = benchmark.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+
+        self.stdout.write(f'{"endpoint":<22}{"p50 ms":>10}{"p95 ms":>10}{"queries":>9}{"errors":>8}')
+        for name, metrics in results['endpoints'].items():
+            self.stdout.write(
+                f'{name:<22}{metrics["p50_ms"]:>10}{metrics["p95_ms"]:>10}'
+                f'{metrics["queries_p50"]:>9}{metrics["errors"]:>8}'
+            )
+
+        if options['compare']:
+            try:
+                with open(options['compare']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+            self.stdout.write(f'\nCompared with {baseline.get("commit") or options["compare"]}:')
+            for name, metric, before, after in compare_results(baseline, results):
+                change = ''
+                if before:
+                    change = f' ({(after - before) / before:+.0%})'
+                self.stdout.write(f'  {name} {metric}: {before} -> {after}{change}')
+
+        self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}.'))
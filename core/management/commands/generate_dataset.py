@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.datagen import DEFAULT_BATCH_SIZE, PASSWORD, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Bulk-insert a synthetic catalog, customers, carts and order histories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Customers to create.')
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--stores', type=int, default=50, help='Stores, one seller each.')
+        parser.add_argument('--category-fanout', type=int, default=5, help='Children per category.')
+        parser.add_argument('--category-depth', type=int, default=3, help='Levels in the category tree.')
+        parser.add_argument('--offers-per-product', type=int, default=2, help='Store items per product.')
+        parser.add_argument('--images-per-product', type=int, default=1)
+        parser.add_argument('--orders-per-user', type=int, default=20)
+        parser.add_argument('--items-per-order', type=int, default=3)
+        parser.add_argument('--cart-items', type=int, default=10, help='Items in every customer cart.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--seed', type=int, help='Seed for reproducible values.')
+
+    def handle(self, *args, **options):
+        if options['category_fanout'] < 1 or options['category_depth'] < 1:
+            raise CommandError('The category tree needs a fanout and depth of at least 1.')
+        if options['stores'] < 1:
+            raise CommandError('At least one store is needed to list products.')
+
+        counts = generate_dataset(
+            users=options['users'],
+            products=options['products'],
+            stores=options['stores'],
+            category_fanout=options['category_fanout'],
+            category_depth=options['category_depth'],
+            offers_per_product=options['offers_per_product'],
+            images_per_product=options['images_per_product'],
+            orders_per_user=options['orders_per_user'],
+            items_per_order=options['items_per_order'],
+            cart_items=options['cart_items'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Done. Generated users log in with password "{PASSWORD}".')
+        )
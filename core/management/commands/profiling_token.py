@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a token that lets a staff user profile requests via the X-Profile header.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the staff user.')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options['email'], is_staff=True, is_active=True)
+        except User.DoesNotExist:
+            raise CommandError(f'No active staff user {options["email"]}.')
+
+        if not settings.PROFILING_ENABLED:
+            self.stderr.write('PROFILING_ENABLED is off; the token is ignored until it is on.')
+        self.stdout.write(make_token(user))
+        self.stderr.write(f'Valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds.')
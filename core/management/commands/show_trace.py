@@ -0,0 +1,83 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def load_spans(path):
+    with open(path) as lines:
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+def critical_path(root, children):
+    """Span ids on the chain of last-finishing children from `root` down."""
+    path = {root['span_id']}
+    span = root
+    while children[span['span_id']]:
+        span = max(children[span['span_id']], key=lambda child: child['start'] + child['duration_ms'] / 1000)
+        path.add(span['span_id'])
+    return path
+
+
+class Command(BaseCommand):
+    help = 'Print a trace from the tracing JSONL file as a span tree, or list the slowest traces.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('trace_id', nargs='?', help='Trace to print (default: list the slowest).')
+        parser.add_argument('--file', help='Defaults to TRACING_FILE.')
+        parser.add_argument('--name', help='Only list root spans whose name contains this.')
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        path = options['file'] or settings.TRACING_FILE
+        try:
+            spans = load_spans(path)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+        if not options['trace_id']:
+            self.list_slowest(spans, options['name'], options['limit'])
+            return
+
+        spans = [span for span in spans if span['trace_id'] == options['trace_id']]
+        if not spans:
+            raise CommandError(f'Trace {options["trace_id"]} not found in {path}.')
+        self.print_tree(spans)
+
+    def list_slowest(self, spans, name, limit):
+        ids = {span['span_id'] for span in spans}
+        roots = [
+            span for span in spans
+            if span['parent_id'] not in ids and (not name or name in span['name'])
+        ]
+        for span in sorted(roots, key=lambda span: -span['duration_ms'])[:limit]:
+            self.stdout.write(f'{span["trace_id"]}  {span["duration_ms"]:>10.1f} ms  {span["name"]}')
+
+    def print_tree(self, spans):
+        ids = {span['span_id'] for span in spans}
+        children = defaultdict(list)
+        roots = []
+        for span in sorted(spans, key=lambda span: span['start']):
+            if span['parent_id'] in ids:
+                children[span['parent_id']].append(span)
+            else:
+                roots.append(span)
+
+        # the trace may span several processes; offsets are from the first span
+        origin = roots[0]['start']
+        self.stdout.write('  offset ms    duration ms  span   (* = critical path)')
+        for root in roots:
+            on_path = critical_path(root, children)
+            stack = [(root, 0)]
+            while stack:
+                span, depth = stack.pop()
+                marker = '*' if span['span_id'] in on_path else ' '
+                status = '' if span['status'] == 'ok' else f' [{span["status"]}]'
+                detail = span['attributes'].get('db.statement') or span['attributes'].get('cache.key') or ''
+                self.stdout.write(
+                    f'{(span["start"] - origin) * 1000:>11.1f} {span["duration_ms"]:>14.1f} {marker} '
+                    f'{"  " * depth}{span["name"]}{status}'
+                    + (f'  {detail[:80]}' if detail else '')
+                )
+                stack.extend((child, depth + 1) for child in reversed(children[span['span_id']]))
@@ -0,0 +1,123 @@
+import os
+import time
+
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_process_shutdown,
+    worker_ready,
+)
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by view (viewset actions as Class.action).',
+    ['view', 'method', 'status'],
+)
+CHECKOUT_LOCK_WAIT = Histogram(
+    'checkout_lock_wait_seconds',
+    'Time checkout spends acquiring the cart and cart item row locks.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+TASK_DURATION = Histogram(
+    'celery_task_duration_seconds',
+    'Celery task run time by task and final state.',
+    ['task', 'state'],
+)
+TASK_QUEUE_LAG = Histogram(
+    'celery_task_queue_lag_seconds',
+    'Time between a task being published and a worker starting it.',
+    ['task'],
+)
+TASKS = Counter('celery_tasks', 'Finished Celery tasks by task and state.', ['task', 'state'])
+CACHE_LOOKUPS = Counter(
+    'cache_lookups',
+    'Two-tier cache lookups of LOCAL_PREFIXES keys by tier (local LRU or backend) and result.',
+    ['tier', 'result'],
+)
+CACHE_FILLS = Counter(
+    'cache_fills',
+    'get_or_compute outcomes: fresh, computed, early (XFetch refresh), stale, waited or unlocked.',
+    ['result'],
+)
+
+
+def get_registry():
+    """The registry to expose; aggregates all processes in multi-process mode."""
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_latest():
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+def view_label(request):
+    """`CartApiView.add_to_cart` for viewset actions, the URL name otherwise."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    cls = getattr(match.func, 'cls', None)
+    if cls is None:
+        return match.view_name or match.func.__name__
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+# Celery task metrics. Publish time travels in a message header so the
+# worker can tell how long the task sat in the queue.
+
+_task_started = {}
+
+
+@before_task_publish.connect
+def _stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers['published_at'] = time.time()
+
+
+@task_prerun.connect
+def _task_prerun(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+    published_at = getattr(task.request, 'published_at', None)
+    if published_at:
+        TASK_QUEUE_LAG.labels(task.name).observe(max(time.time() - published_at, 0))
+
+
+@task_postrun.connect
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    state = state or 'UNKNOWN'
+    if started is not None:
+        TASK_DURATION.labels(task.name, state).observe(time.perf_counter() - started)
+    TASKS.labels(task.name, state).inc()
+
+
+@worker_ready.connect
+def _start_worker_exporter(**kwargs):
+    # workers have no HTTP server of their own; serve /metrics on a side port
+    port = os.getenv('CELERY_METRICS_PORT')
+    if port:
+        start_http_server(int(port), registry=get_registry())
+
+
+@worker_process_shutdown.connect
+def _mark_worker_process_dead(pid=None, **kwargs):
+    # drops the exited prefork child's live gauges from the shared directory
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,152 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import instrumentation, profiling, tracing
+from .metrics import REQUEST_LATENCY, view_label
+
+
+logger = logging.getLogger(__name__)
+
+
+class TracingMiddleware:
+    """Opens the server span for each request, continuing an incoming `traceparent`."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracing.trace(
+            f'{request.method} {request.path}',
+            tracing.SERVER,
+            traceparent=request.headers.get('traceparent'),
+            **{'http.method': request.method, 'http.target': request.path},
+        ) as span:
+            response = self.get_response(request)
+            if span is not None:
+                span.name = f'{request.method} {view_label(request)}'
+                span.set(**{'http.status_code': response.status_code})
+                if response.status_code >= 500:
+                    span.status = 'error'
+                response['traceparent'] = tracing.format_traceparent(span)
+            return response
+
+
+class RequestMetricsMiddleware:
+    """Counts the DB, cache and outbound HTTP work of each request.
+
+    Sampled requests get a `Server-Timing` header and one JSON log line.
+    The sample rate is REQUEST_METRICS_SAMPLE_RATE, overridable per URL
+    name through REQUEST_METRICS_SAMPLE_RATES (0 turns a view off).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+
+    def __call__(self, request):
+        token = instrumentation.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(instrumentation.record_query))
+                response = self.get_response(request)
+        finally:
+            metrics = instrumentation.stop(token)
+
+        view_name = self.view_name(request)
+        if self.sampled(view_name):
+            response['Server-Timing'] = self.server_timing(metrics)
+            logger.info(json.dumps({
+                'event': 'request_metrics',
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                **metrics.as_dict(),
+            }))
+        return response
+
+    def view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        return match.view_name
+
+    def sampled(self, view_name):
+        rate = settings.REQUEST_METRICS_SAMPLE_RATES.get(
+            view_name, settings.REQUEST_METRICS_SAMPLE_RATE
+        )
+        return rate >= 1 or random.random() < rate
+
+    def server_timing(self, metrics):
+        return ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+            f'cache;dur={metrics.cache_time * 1000:.1f};'
+            f'desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+            f'http;dur={metrics.http_time * 1000:.1f};desc="{metrics.http_calls} calls"',
+            f'total;dur={metrics.total_time * 1000:.1f}',
+        ])
+
+
+class PrometheusMiddleware:
+    """Observes request latency per view in the Prometheus histograms."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        REQUEST_LATENCY.labels(view_label(request), request.method, response.status_code).observe(
+            time.perf_counter() - started
+        )
+        return response
+
+
+class ProfilingMiddleware:
+    """Runs cProfile around requests that carry a staff profiling token.
+
+    The token comes from `manage.py profiling_token` and is only accepted
+    in the `X-Profile` header; query strings end up in access logs, metrics
+    log lines and traces. Profiled responses
+    get an `X-Profile-Id` header pointing at the RequestProfile in the admin;
+    refused ones get `X-Profile-Status` and are served normally.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.headers.get('X-Profile')
+        if not token or not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+
+        user = profiling.staff_user_for_token(token)
+        if user is None:
+            status = 'denied'
+        elif not profiling.acquire_slot(user.pk):
+            status = 'rate-limited'
+        else:
+            profiler = profiling.start_profiler()
+            if profiler is None:
+                status = 'busy'
+            else:
+                started = time.perf_counter()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+                duration = time.perf_counter() - started
+                profile = profiling.save_profile(profiler, request, response, user, duration)
+                response['X-Profile-Id'] = str(profile.pk)
+                return response
+
+        response = self.get_response(request)
+        response['X-Profile-Status'] = status
+        return response
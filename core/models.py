@@ -1,5 +1,24 @@
+import uuid
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
 from django.db import models
+from django.dispatch import Signal
 from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+# BaseQuerySet.delete()/restore() are plain UPDATEs and skip the per-object
+# post_save/post_delete signals; receivers get `sender` (the model) and `restored`
+bulk_soft_delete = Signal()
+
+# purge_soft_deleted() sends this once per batch with `deleted`, the
+# {'app.Model': count} of rows it removed (cascades included); while it runs
+# `purging` is set so per-row post_delete receivers can leave batch-wide work to it
+bulk_purge = Signal()
+purging = ContextVar('purging', default=False)
 
 
 class BaseQuerySet(models.QuerySet):
@@ -7,10 +26,17 @@ class BaseQuerySet(models.QuerySet):
         return super().delete()
 
     def delete(self):
-        return super().update(is_deleted=True, deleted_at=timezone.now())
+        now = timezone.now()
+        updated = super().update(is_deleted=True, deleted_at=now, updated_at=now)
+        if updated:
+            bulk_soft_delete.send(sender=self.model, restored=False)
+        return updated
 
     def restore(self):
-        return super().update(is_deleted=False, deleted_at=None)
+        updated = super().update(is_deleted=False, deleted_at=None, updated_at=timezone.now())
+        if updated:
+            bulk_soft_delete.send(sender=self.model, restored=True)
+        return updated
 
 
 class BaseManager(models.Manager):
@@ -45,12 +71,15 @@ class BaseModel(models.Model):
     def delete(self, using=None, keep_parents=False):
         self.is_deleted = True
         self.deleted_at = timezone.now()
-        self.save(update_fields=['is_deleted', 'deleted_at'])
+        self.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
 
     def restore(self):
         self.is_deleted = False
         self.deleted_at = None
-        self.save(update_fields=['is_deleted', 'deleted_at'])
+        self.save(update_fields=['is_deleted', 'deleted_at', 'updated_at'])
+
+
+SITE_CONFIG_VERSION_KEY = 'site_config:version'
 
 
 class SiteConfiguration(models.Model):
@@ -81,3 +110,61 @@ class SiteConfiguration(models.Model):
         # always return the single instance (create it if missing)
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
+
+    # (version, instance) loaded by this process
+    _cached = None
+
+    @classmethod
+    def get_cached(cls):
+        """The singleton, reloaded only when the shared version stamp changes."""
+        version = cache.get(SITE_CONFIG_VERSION_KEY)
+        if version is None:
+            cache.add(SITE_CONFIG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(SITE_CONFIG_VERSION_KEY)
+
+        cached = cls._cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        obj = cls.get_solo()
+        cls._cached = (version, obj)
+        return obj
+
+    @classmethod
+    def invalidate_cache(cls):
+        cls._cached = None
+        cache.set(SITE_CONFIG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+@deconstructible
+class ProfileStorage(FileSystemStorage):
+    """Local disk under PROFILING_ROOT; profiles are downloaded through the admin."""
+
+    @property
+    def base_location(self):
+        return settings.PROFILING_ROOT
+
+    @property
+    def location(self):
+        return str(self.base_location)
+
+
+class RequestProfile(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='request_profiles'
+    )
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    # marshalled pstats data, loadable with pstats.Stats(path) or snakeviz
+    file = models.FileField(upload_to='%Y/%m/%d/', storage=ProfileStorage())
+    summary = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} ms)'
@@ -0,0 +1,94 @@
+import cProfile
+import io
+import marshal
+import pstats
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+from .models import RequestProfile
+
+TOKEN_SALT = 'core.profiling'
+SUMMARY_LINES = 40
+
+
+def make_token(user):
+    """A token that lets `user` profile requests for PROFILING_TOKEN_MAX_AGE."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def staff_user_for_token(token):
+    """The active staff user the token was issued to, or None."""
+    try:
+        user_id = signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_staff=True, is_active=True).first()
+
+
+def acquire_slot(user_id):
+    """Applies the global per-minute cap, then the per-user interval.
+
+    The cap is checked first so a refused request doesn't use up the
+    user's slot.
+    """
+    minute_key = f'profiling:minute:{int(time.time() // 60)}'
+    cache.add(minute_key, 0, timeout=120)
+    try:
+        if cache.incr(minute_key) > settings.PROFILING_MAX_PER_MINUTE:
+            return False
+    except ValueError:
+        # the key expired between add and incr
+        return False
+    if cache.add(f'profiling:user:{user_id}', 1, timeout=settings.PROFILING_USER_INTERVAL):
+        return True
+    try:
+        cache.decr(minute_key)
+    except ValueError:
+        pass
+    return False
+
+
+def start_profiler():
+    """An enabled cProfile profiler, or None if another profiler is active."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+def save_profile(profiler, request, response, user, duration):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    match = getattr(request, 'resolver_match', None)
+
+    profile = RequestProfile(
+        user=user,
+        method=request.method,
+        path=request.path[:500],
+        view_name=(match.view_name if match else '') or '',
+        status_code=response.status_code,
+        duration_ms=round(duration * 1000, 2),
+        summary=stats.stream.getvalue(),
+    )
+    # same format as Stats.dump_stats, so pstats/snakeviz can open the file
+    profile.file.save(f'{int(time.time())}.pstats', ContentFile(marshal.dumps(stats.stats)), save=False)
+    profile.save()
+    prune_profiles()
+    return profile
+
+
+def prune_profiles():
+    """Keeps the newest PROFILING_KEEP profiles and deletes the rest with their files."""
+    stale = RequestProfile.objects.order_by('-created_at', '-id')[settings.PROFILING_KEEP:]
+    for profile in stale:
+        profile.file.delete(save=False)
+        profile.delete()
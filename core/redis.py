@@ -0,0 +1,13 @@
+from django.core.cache import cache as default_cache
+
+
+def get_redis_client(cache=None):
+    """The raw redis client behind `cache`, or None when it isn't django-redis."""
+    try:
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return None
+    cache = cache or default_cache
+    if not isinstance(cache, RedisCache):
+        return None
+    return cache.client.get_client(write=True)
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.utils import timezone
+
+from .models import bulk_purge, purging
+
+
+def purge_soft_deleted(model, cutoff, batch_size=500, max_batches=20):
+    """Hard-deletes rows of `model` that were soft-deleted before `cutoff`.
+
+    Works through the backlog in small id-ordered batches so each DELETE
+    stays short and doesn't hold locks on the hot tables for long.
+    """
+    purged = 0
+    token = purging.set(True)
+    try:
+        for _ in range(max_batches):
+            ids = list(
+                model.all_objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            _, deleted = model.all_objects.filter(id__in=ids).delete()
+            bulk_purge.send(sender=model, deleted=deleted)
+            purged += len(ids)
+    finally:
+        purging.reset(token)
+    return purged
+
+
+def purge_all_soft_deleted(retention_days):
+    """Runs `purge_soft_deleted` for each `'app.Model': days` entry."""
+    now = timezone.now()
+    return {
+        label: purge_soft_deleted(
+            apps.get_model(label), now - timedelta(days=days)
+        )
+        for label, days in retention_days.items()
+    }
@@ -0,0 +1,11 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import SiteConfiguration
+
+
+@receiver(post_save, sender=SiteConfiguration)
+@receiver(post_delete, sender=SiteConfiguration)
+def invalidate_site_config_signal(sender, instance, **kwargs):
+    transaction.on_commit(SiteConfiguration.invalidate_cache)
@@ -0,0 +1,10 @@
+from celery import shared_task
+from django.conf import settings
+
+from .services import purge_all_soft_deleted
+
+
+@shared_task
+def purge_soft_deleted_task():
+    purged = purge_all_soft_deleted(settings.SOFT_DELETE_RETENTION_DAYS)
+    return f'Purged soft-deleted rows: {purged}.'
@@ -0,0 +1,105 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_NOISE = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def normalize_sql(sql):
+    """The shape of a query: literals become `?` and IN lists collapse."""
+    shape = _STRING.sub('?', sql)
+    shape = _NUMBER.sub('?', shape)
+    return _IN_LIST.sub('IN (...)', shape)
+
+
+class QueryLog:
+    """The queries captured while running one block, grouped by shape."""
+
+    def __init__(self, captured):
+        self.queries = [
+            query['sql'] for query in captured if not query['sql'].startswith(_NOISE)
+        ]
+        self.shapes = Counter(normalize_sql(sql) for sql in self.queries)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold):
+        """Shapes run at least `threshold` times, the usual sign of an N+1."""
+        return [
+            (shape, count)
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+    def report(self, repeat_threshold=None):
+        lines = [f'{len(self)} queries, {len(self.shapes)} distinct shapes']
+        if repeat_threshold:
+            for shape, count in self.repeated(repeat_threshold):
+                lines.append(f'  possible N+1, ran {count}x: {shape}')
+        lines.append('Queries:')
+        lines.extend(f'  {index}. {sql}' for index, sql in enumerate(self.queries, 1))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def capture_queries(using=None):
+    """Yields a list that holds the `QueryLog` once the block exits.
+
+    Works without a TestCase, e.g. from a pytest fixture.
+    """
+    result = []
+    with CaptureQueriesContext(connections[using or DEFAULT_DB_ALIAS]) as context:
+        yield result
+    result.append(QueryLog(context.captured_queries))
+
+
+class QueryBudgetMixin:
+    """Query budget assertions for API tests.
+
+    with self.assertQueryBudget(4):
+        self.client.get(url)
+
+    fails if the block runs more than four queries or repeats one query
+    shape `repeat_threshold` times or more. `assertConstantQueries` runs a
+    request, grows the data and runs it again, failing unless both cost
+    the same number of queries, i.e. the endpoint is O(1) in queries.
+    """
+
+    repeat_threshold = 3
+
+    @contextmanager
+    def assertQueryBudget(self, budget, repeat_threshold=None, using=None):
+        repeat_threshold = repeat_threshold or self.repeat_threshold
+        with capture_queries(using) as result:
+            yield
+        log = result[0]
+        problems = []
+        if len(log) > budget:
+            problems.append(f'{len(log)} queries, budget is {budget}.')
+        if log.repeated(repeat_threshold):
+            problems.append(f'Query shapes repeated {repeat_threshold}+ times.')
+        if problems:
+            self.fail('\n'.join([*problems, log.report(repeat_threshold)]))
+
+    def assertConstantQueries(self, run, grow, using=None):
+        """`run()` must cost the same number of queries before and after `grow()`."""
+        with capture_queries(using) as before:
+            run()
+        grow()
+        with capture_queries(using) as after:
+            run()
+        before, after = before[0], after[0]
+        if len(after) != len(before):
+            self.fail(
+                f'Query count grew with the data: {len(before)} -> {len(after)}.\n'
+                f'Before:\n{before.report()}\n'
+                f'After:\n{after.report(self.repeat_threshold)}'
+            )
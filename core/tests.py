@@ -1,3 +1,685 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from accounts.models import Address
+from accounts.tasks import send_otp_email_task
+from core.models import RequestProfile, SiteConfiguration
+from core import tracing
+from core.cache import CachedValue, TwoTierCacheMixin, _reset_local_tiers, get_or_compute
+from core.profiling import make_token
+from core.services import purge_soft_deleted
+from core.tasks import purge_soft_deleted_task
+from core.throttles import AnonRateThrottle
+from orders.models import Cart, CartItem, Order, OrderItem, Payment
+from products.models import Category, Comment, Product, ProductImage
+from stores.models import Store, StoreItem
+
+
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = APIRequestFactory().get("/")
+        self.request.user = Mock(is_authenticated=False)
+        self.redis = Mock()
+        self.script = self.redis.register_script.return_value
+
+    def check(self, throttle):
+        with patch("core.throttles.get_redis_client", return_value=self.redis), patch(
+            "core.throttles._token_bucket", None
+        ):
+            return throttle.allow_request(self.request, view=None)
+
+    @patch.object(AnonRateThrottle, "THROTTLE_RATES", {"anon": "5/min"})
+    def test_runs_one_script_call_per_check(self):
+        self.script.return_value = [1, 0]
+        throttle = AnonRateThrottle()
+
+        self.assertTrue(self.check(throttle))
+        self.script.assert_called_once_with(
+            keys=[cache.make_key("throttle_anon_127.0.0.1")], args=[5, 60000], client=self.redis
+        )
+
+    @patch.object(AnonRateThrottle, "THROTTLE_RATES", {"anon": "5/min"})
+    def test_rejected_request_reports_wait(self):
+        self.script.return_value = [0, 1500]
+        throttle = AnonRateThrottle()
+
+        self.assertFalse(self.check(throttle))
+        self.assertEqual(throttle.wait(), 1.5)
+
+    @patch.object(AnonRateThrottle, "THROTTLE_RATES", {"anon": "1/min"})
+    def test_falls_back_to_cache_without_redis(self):
+        throttle = AnonRateThrottle()
+
+        self.assertTrue(throttle.allow_request(self.request, view=None))
+        self.assertFalse(AnonRateThrottle().allow_request(self.request, view=None))
+
+
+class SiteConfigurationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        SiteConfiguration._cached = None
+
+    def test_cached_config_skips_database(self):
+        SiteConfiguration.get_cached()
+
+        with self.assertNumQueries(0):
+            config = SiteConfiguration.get_cached()
+        self.assertEqual(config.site_header, "CustomyShop Admin")
+
+    def test_save_invalidates_cached_config(self):
+        config = SiteConfiguration.get_cached()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            config.site_header = "Renamed"
+            config.save()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(SiteConfiguration.get_cached().site_header, "Renamed")
+
+
+class PurgeSoftDeletedTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email="purge@test.com", password="pass123")
+        store = Store.objects.create(name="Store", seller=user)
+        category = Category.objects.create(name="Category", description="Desc")
+        product = Product.objects.create(name="Product", description="Desc", category=category)
+        store_item = StoreItem.objects.create(store=store, product=product, price=10, stock=5)
+        cart = Cart.objects.create(user=user)
+        self.items = []
+        for deleted in (True, True, True, False):
+            item = CartItem.objects.create(cart=cart, store_item=store_item)
+            if deleted:
+                item.delete()
+            self.items.append(item)
+
+        CartItem.all_objects.filter(id__in=[item.id for item in self.items[:2]]).update(
+            deleted_at=timezone.now() - timedelta(days=40)
+        )
+
+    def test_hard_deletes_old_soft_deleted_rows_in_batches(self):
+        purged = purge_soft_deleted(CartItem, timezone.now() - timedelta(days=30), batch_size=1)
+
+        self.assertEqual(purged, 2)
+        self.assertEqual(
+            list(CartItem.all_objects.order_by("id").values_list("id", flat=True)),
+            [self.items[2].id, self.items[3].id],
+        )
+
+    @patch("products.signals.bump_catalog_version")
+    def test_purged_images_lose_their_files_and_bump_once_per_batch(self, bump):
+        product = Product.objects.get()
+        images = [
+            ProductImage.objects.create(product=product, image=ContentFile(b"img", name=f"{number}.png"))
+            for number in range(3)
+        ]
+        names = [image.image.name for image in images]
+        ProductImage.objects.filter(id__in=[image.id for image in images]).delete()
+        ProductImage.all_objects.update(deleted_at=timezone.now() - timedelta(days=100))
+        bump.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purged = purge_soft_deleted(ProductImage, timezone.now() - timedelta(days=90), batch_size=2)
+
+        self.assertEqual(purged, 3)
+        self.assertEqual(bump.call_count, 2)
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    @override_settings(SOFT_DELETE_RETENTION_DAYS={"orders.CartItem": 30})
+    def test_task_uses_configured_retention(self):
+        self.assertEqual(purge_soft_deleted_task(), "Purged soft-deleted rows: {'orders.CartItem': 2}.")
+
+
+class QueryPlanTests(TestCase):
+    """The main query of each hot endpoint must be served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.users = [User.objects.create_user(email=f"plan{i}@test.com", password="pass123") for i in range(5)]
+        store = Store.objects.create(name="Store", seller=cls.users[0])
+        category = Category.objects.create(name="Category", description="Desc")
+        cls.product = Product.objects.create(name="Product", description="Desc", category=category)
+        for i, user in enumerate(cls.users):
+            address = Address.objects.create(
+                user=user, label="Home", address_line_1="Line 1", city="City",
+                state="State", country="Country", postal_code="0000", is_default=True,
+            )
+            StoreItem.objects.create(store=store, product=cls.product, price=10, stock=5, is_active=i % 2 == 0)
+            Comment.objects.create(user=user, product=cls.product, description="Nice", is_approved=i % 2 == 0)
+            for _ in range(4):
+                order = Order.objects.create(customer=user, address=address)
+                Payment.objects.create(order=order, amount=10)
+        cls.order = Order.objects.first()
+
+    def plan(self, queryset):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index):
+        plan = self.plan(queryset)
+        # the foreign key indexes would also avoid a scan, so check for the index itself
+        self.assertIn(index, plan)
+        if connection.vendor == "sqlite":
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_my_orders(self):
+        self.assertUsesIndex(
+            Order.objects.filter(customer=self.users[1]).order_by("-created_at"), "order_customer_created_idx"
+        )
+
+    def test_order_payment_lookup(self):
+        self.assertUsesIndex(
+            Payment.objects.filter(order=self.order, status=Payment.PENDING), "payment_order_status_idx"
+        )
+
+    def test_store_item_listing(self):
+        self.assertUsesIndex(
+            StoreItem.objects.filter(is_active=True).order_by("-created_at"), "storeitem_active_created_idx"
+        )
+
+    def test_approved_comments(self):
+        self.assertUsesIndex(
+            Comment.objects.filter(product=self.product, is_approved=True), "comment_product_approved_idx"
+        )
+
+    def test_default_address(self):
+        self.assertUsesIndex(
+            Address.objects.filter(user=self.users[1], is_default=True), "address_user_default_idx"
+        )
+
+    def test_pending_orders(self):
+        self.assertUsesIndex(
+            Order.objects.filter(status=Order.PENDING, id__gt=0).order_by("id"), "order_pending_idx"
+        )
+
+    def test_payments_to_roll_up(self):
+        self.assertUsesIndex(
+            Payment.objects.filter(status=Payment.SUCCESS, rolled_up_at__isnull=True).order_by("id"),
+            "payment_pending_rollup_idx",
+        )
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+class RequestMetricsMiddlewareTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(email="metrics@test.com", password="pass123")
+        self.client.force_authenticate(user=user)
+
+    def test_reports_queries_and_cache_usage(self):
+        url = reverse("mycart-list")
+        with self.assertLogs("core.middleware", level="INFO"):
+            self.client.get(url)
+
+        with self.assertLogs("core.middleware", level="INFO") as logs:
+            response = self.client.get(url)
+
+        self.assertIn('queries"', response["Server-Timing"])
+        self.assertRegex(response["Server-Timing"], r'cache;dur=[\d.]+;desc="[1-9]\d* hits, 0 misses"')
+        self.assertIn('"view": "mycart-list"', logs.output[0])
+        self.assertIn('"db_queries": ', logs.output[0])
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATES={"mycart-list": 0})
+    def test_views_can_opt_out_of_sampling(self):
+        response = self.client.get(reverse("mycart-list"))
+
+        self.assertNotIn("Server-Timing", response)
+
+
+@override_settings(METRICS_AUTH_TOKEN="secret")
+class PrometheusMetricsTests(APITestCase):
+    def test_exposes_view_and_task_metrics(self):
+        user = get_user_model().objects.create_user(email="prom@test.com", password="pass123")
+        self.client.force_authenticate(user=user)
+        self.client.get(reverse("mycart-list"))
+        send_otp_email_task.delay("prom@test.com", "123456")
+
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="GET",status="200",view="CartApiView.list"}', body)
+        self.assertIn(
+            'celery_task_duration_seconds_count{state="SUCCESS",task="accounts.tasks.send_otp_email_task"}', body
+        )
+
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_AUTH_TOKEN="")
+    def test_endpoint_is_closed_without_a_token_except_to_staff(self):
+        self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+        customer = get_user_model().objects.create_user(email="customer@test.com", password="pass123")
+        self.client.force_login(customer)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        staff = get_user_model().objects.create_user(email="staff@test.com", password="pass123", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+
+class DatasetAndBenchmarkCommandTests(TestCase):
+    def generate(self):
+        call_command(
+            "generate_dataset",
+            users=3,
+            products=20,
+            stores=2,
+            category_fanout=2,
+            category_depth=3,
+            orders_per_user=4,
+            items_per_order=2,
+            cart_items=3,
+            batch_size=7,
+            seed=1,
+            stdout=StringIO(),
+        )
+
+    def test_generate_dataset_builds_every_table(self):
+        self.generate()
+
+        self.assertEqual(Category.objects.count(), 2 + 4 + 8)
+        self.assertEqual(Category.objects.filter(parent__parent__isnull=False).count(), 8)
+        self.assertEqual(Product.objects.count(), 20)
+        self.assertEqual(StoreItem.objects.count(), 40)
+        self.assertEqual(get_user_model().objects.filter(role="customer").count(), 3)
+        self.assertEqual(CartItem.objects.count(), 9)
+        self.assertEqual(Order.objects.count(), 12)
+        self.assertEqual(OrderItem.objects.count(), 24)
+        self.assertEqual(Payment.objects.count(), 12)
+        self.assertGreater(
+            Order.objects.order_by("created_at").first().created_at,
+            timezone.now() - timedelta(days=731),
+        )
+
+    def test_benchmark_writes_results_and_rolls_back(self):
+        self.generate()
+        StoreItem.objects.update(stock=100)
+        orders_before = Order.objects.count()
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            call_command(
+                "benchmark", output=output, requests=2, warmup=1, seed=1, stdout=StringIO()
+            )
+            with open(output) as results_file:
+                results = json.load(results_file)
+
+        self.assertEqual(Order.objects.count(), orders_before)
+        endpoints = results["endpoints"]
+        self.assertEqual(
+            set(endpoints),
+            {
+                "catalog_list", "catalog_search", "cart_list", "cart_add",
+                "cart_update_quantity", "cart_remove_item", "checkout", "my_orders",
+            },
+        )
+        for metrics in endpoints.values():
+            self.assertEqual(metrics["errors"], 0)
+            self.assertLessEqual(metrics["p50_ms"], metrics["p95_ms"])
+        self.assertGreater(endpoints["my_orders"]["queries_p50"], 0)
+
+
+class ProfilingMiddlewareTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.profiles_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profiles_dir.cleanup)
+        settings_override = override_settings(
+            PROFILING_ENABLED=True, PROFILING_ROOT=self.profiles_dir.name, PROFILING_KEEP=2
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = get_user_model().objects.create_user(
+            email="staff@example.com", password="pass123", is_staff=True, is_superuser=True
+        )
+        self.url = reverse("category-list")
+
+    def test_staff_token_profiles_the_request(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE=make_token(self.staff))
+
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(profile.user, self.staff)
+        self.assertEqual(profile.view_name, "category-list")
+        self.assertIn("cumulative", profile.summary)
+        self.assertTrue(os.path.exists(profile.file.path))
+
+        self.client.force_login(self.staff)
+        download = self.client.get(reverse("admin:core_requestprofile_download", args=[profile.pk]))
+        self.assertEqual(download.status_code, 200)
+        self.assertGreater(len(b"".join(download.streaming_content)), 0)
+
+    def test_users_are_rate_limited_and_the_query_parameter_is_ignored(self):
+        token = make_token(self.staff)
+        ignored = self.client.get(self.url, {"profile": token})
+        first = self.client.get(self.url, HTTP_X_PROFILE=token)
+        second = self.client.get(self.url, HTTP_X_PROFILE=token)
+
+        self.assertNotIn("X-Profile-Id", ignored)
+        self.assertNotIn("X-Profile-Status", ignored)
+        self.assertIn("X-Profile-Id", first)
+        self.assertEqual(second["X-Profile-Status"], "rate-limited")
+        self.assertEqual(RequestProfile.objects.count(), 1)
+
+    @override_settings(PROFILING_USER_INTERVAL=0, PROFILING_MAX_PER_MINUTE=1)
+    def test_global_cap(self):
+        token = make_token(self.staff)
+        self.client.get(self.url, HTTP_X_PROFILE=token)
+        cache.delete(f"profiling:user:{self.staff.pk}")
+        response = self.client.get(self.url, HTTP_X_PROFILE=token)
+
+        self.assertEqual(response["X-Profile-Status"], "rate-limited")
+
+    @override_settings(PROFILING_MAX_PER_MINUTE=0)
+    def test_global_cap_does_not_use_up_the_user_slot(self):
+        response = self.client.get(self.url, HTTP_X_PROFILE=make_token(self.staff))
+
+        self.assertEqual(response["X-Profile-Status"], "rate-limited")
+        self.assertIsNone(cache.get(f"profiling:user:{self.staff.pk}"))
+
+    def test_non_staff_and_forged_tokens_are_denied(self):
+        customer = get_user_model().objects.create_user(email="user@example.com", password="pass123")
+        for token in (make_token(customer), make_token(self.staff) + "x"):
+            response = self.client.get(self.url, HTTP_X_PROFILE=token)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["X-Profile-Status"], "denied")
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_old_profiles_are_pruned_with_their_files(self):
+        paths = []
+        for _ in range(3):
+            cache.clear()
+            response = self.client.get(self.url, HTTP_X_PROFILE=make_token(self.staff))
+            paths.append(RequestProfile.objects.get(pk=response["X-Profile-Id"]).file.path)
+
+        self.assertEqual(RequestProfile.objects.count(), 2)
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(os.path.exists(paths[2]))
+
+
+class TracingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "traces.jsonl")
+        settings_override = override_settings(
+            TRACING_ENABLED=True, TRACING_SAMPLE_RATE=1.0, TRACING_FILE=self.path
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = get_user_model().objects.create_user(email="user@example.com", password="pass123")
+        self.client.force_authenticate(user=self.user)
+
+    def spans(self):
+        with open(self.path) as lines:
+            return [json.loads(line) for line in lines]
+
+    def test_request_span_has_db_and_cache_children(self):
+        parent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+        response = self.client.get(reverse("mycart-list"), HTTP_TRACEPARENT=parent)
+
+        spans = self.spans()
+        root = next(span for span in spans if span["kind"] == "server")
+        self.assertEqual(root["name"], "GET CartApiView.list")
+        self.assertEqual(root["trace_id"], "a" * 32)
+        self.assertEqual(root["parent_id"], "b" * 16)
+        self.assertEqual(root["attributes"]["http.status_code"], 200)
+        self.assertTrue(response["traceparent"].startswith("00-" + "a" * 32 + "-" + root["span_id"]))
+
+        names = {span["name"] for span in spans}
+        self.assertIn("db.query", names)
+        self.assertIn("cache.get", names)
+        self.assertEqual({span["trace_id"] for span in spans}, {"a" * 32})
+
+    def test_unsampled_requests_are_not_exported(self):
+        self.client.get(reverse("mycart-list"), HTTP_TRACEPARENT="00-" + "a" * 32 + "-" + "b" * 16 + "-00")
+        self.assertFalse(os.path.exists(self.path))
+
+    @override_settings(TRACING_ENABLED=False)
+    def test_disabled(self):
+        response = self.client.get(reverse("mycart-list"))
+        self.assertNotIn("traceparent", response)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_celery_headers_carry_the_trace(self):
+        headers = {}
+        with tracing.trace("publisher") as publisher:
+            tracing._inject_traceparent(headers=headers)
+        self.assertEqual(headers["traceparent"], tracing.format_traceparent(publisher))
+
+        task = Mock()
+        task.name = "accounts.tasks.send_otp_email_task"
+        task.request.traceparent = headers["traceparent"]
+        tracing._start_task_trace(task_id="t1", task=task)
+        tracing._finish_task_trace(task_id="t1", state="SUCCESS")
+
+        consumer = self.spans()[-1]
+        self.assertEqual(consumer["kind"], "consumer")
+        self.assertEqual(consumer["trace_id"], publisher.trace_id)
+        self.assertEqual(consumer["parent_id"], publisher.span_id)
+        self.assertEqual(consumer["attributes"]["celery.state"], "SUCCESS")
+
+    def test_outgoing_requests_get_a_client_span_and_traceparent(self):
+        import requests
+
+        sent = {}
+
+        def fake_send(adapter, request, **kwargs):
+            sent["traceparent"] = request.headers["traceparent"]
+            response = requests.Response()
+            response.status_code = 200
+            return response
+
+        with patch("requests.adapters.HTTPAdapter.send", fake_send):
+            with tracing.trace("payment") as root:
+                requests.post("https://sandbox.zarinpal.com/pg/v4/payment/request.json?x=1", json={})
+
+        client = next(span for span in self.spans() if span["kind"] == "client")
+        self.assertEqual(client["parent_id"], root.span_id)
+        self.assertEqual(client["attributes"]["http.url"], "https://sandbox.zarinpal.com/pg/v4/payment/request.json")
+        self.assertEqual(sent["traceparent"], f"00-{root.trace_id}-{client['span_id']}-01")
+
+    def test_show_trace_prints_the_critical_path(self):
+        self.client.get(reverse("mycart-list"))
+        trace_id = self.spans()[0]["trace_id"]
+
+        out = StringIO()
+        call_command("show_trace", trace_id, file=self.path, stdout=out)
+        self.assertIn("* GET CartApiView.list", out.getvalue())
+        self.assertIn("db.query", out.getvalue())
+
+        out = StringIO()
+        call_command("show_trace", file=self.path, stdout=out)
+        self.assertIn(trace_id, out.getvalue())
+
+
+class LocMemTwoTierCache(TwoTierCacheMixin, LocMemCache):
+    pass
+
+
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        self.backend = self.make_backend()
+        self.backend.clear()
+        self.redis = Mock()
+        patcher = patch("core.cache.get_redis_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # no listener thread in tests; invalidations are delivered by hand
+        patcher = patch("core.cache.LocalTier.ensure_listener")
+        self.ensure_listener = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_backend(self):
+        # the local tier is shared per location, so keep each test's apart
+        return LocMemTwoTierCache(self.id(), {"OPTIONS": {"LOCAL_PREFIXES": ["catalog:"], "LOCAL_MAX_ENTRIES": 2}})
+
+    def test_instances_in_other_threads_share_the_local_tier(self):
+        self.backend.set("catalog:a", 1)
+        self.backend.get("catalog:a")
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.make_backend()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(other[0].tier, self.backend.tier)
+        self.assertEqual(other[0].get("catalog:a"), 1)
+        self.assertEqual(self.backend.stats()["local_hit"], 1)
+        self.assertEqual(self.ensure_listener.call_count, 2)
+        self.assertIs(self.ensure_listener.call_args.args[0], self.redis)
+
+    def test_forked_children_start_with_an_empty_tier(self):
+        self.backend.set("catalog:a", 1)
+        self.backend.get("catalog:a")
+        parent_tier = self.backend.tier
+
+        _reset_local_tiers()
+
+        self.assertIsNot(self.backend.tier, parent_tier)
+        self.assertEqual(self.backend.stats()["local_entries"], 0)
+
+    def test_local_prefix_reads_are_served_from_the_lru(self):
+        self.backend.set("catalog:a", 1)
+        self.assertEqual(self.backend.get("catalog:a"), 1)
+        with patch.object(LocMemCache, "get") as backend_get:
+            self.assertEqual(self.backend.get("catalog:a"), 1)
+        backend_get.assert_not_called()
+        self.assertEqual(self.backend.stats()["local_hit"], 1)
+        self.assertEqual(self.backend.stats()["backend_hit"], 1)
+
+    def test_other_keys_skip_the_lru(self):
+        self.backend.set("cart:1", 1)
+        self.backend.get("cart:1")
+        self.assertEqual(self.backend.stats()["local_entries"], 0)
+        self.redis.publish.assert_not_called()
+
+    def test_writes_drop_the_local_copy_and_publish(self):
+        self.backend.set("catalog:a", 1)
+        self.backend.get("catalog:a")
+        self.backend.set("catalog:a", 2)
+
+        self.assertEqual(self.backend.get("catalog:a"), 2)
+        self.redis.publish.assert_called_with("cache:invalidate", json.dumps([self.backend.make_key("catalog:a")]))
+
+    def test_messages_from_other_processes_drop_entries(self):
+        self.backend.set("catalog:a", 1)
+        self.backend.get("catalog:a")
+        # another process wrote the key straight to the shared backend
+        LocMemCache.set(self.backend, "catalog:a", 2)
+        self.assertEqual(self.backend.get("catalog:a"), 1)
+
+        self.backend.handle_invalidation([self.backend.make_key("catalog:a")])
+        self.assertEqual(self.backend.get("catalog:a"), 2)
+
+        self.backend.handle_invalidation(["*"])
+        self.assertEqual(self.backend.stats()["local_entries"], 0)
+
+    def test_reads_racing_an_invalidation_are_not_kept(self):
+        LocMemCache.set(self.backend, "catalog:a", 1)
+        original_get = LocMemCache.get
+
+        def get_then_invalidate(backend, *args, **kwargs):
+            value = original_get(backend, *args, **kwargs)
+            backend.handle_invalidation([backend.make_key("catalog:a")])
+            return value
+
+        with patch.object(LocMemCache, "get", get_then_invalidate):
+            self.assertEqual(self.backend.get("catalog:a"), 1)
+        self.assertEqual(self.backend.stats()["local_entries"], 0)
+
+    def test_get_many_mixes_tiers(self):
+        self.backend.set_many({"catalog:a": 1, "catalog:b": 2, "cart:1": 3})
+        self.backend.get("catalog:a")
+        self.assertEqual(self.backend.get_many(["catalog:a", "catalog:b", "cart:1"]), {"catalog:a": 1, "catalog:b": 2, "cart:1": 3})
+        self.assertEqual(self.backend.stats()["local_entries"], 2)
+
+
+class GetOrComputeTests(TestCase):
+    def setUp(self):
+        self.cache = LocMemCache("get-or-compute-tests", {})
+        self.cache.clear()
+        self.calls = 0
+
+    def compute(self, value="value", delay=0):
+        def run():
+            self.calls += 1
+            time.sleep(delay)
+            return value
+
+        return run
+
+    def test_cold_key_is_computed_once_under_concurrency(self):
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(get_or_compute("hot", self.compute(delay=0.2), 60, cache=self.cache))
+            )
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["value"] * 10)
+
+    def test_fresh_entries_are_served(self):
+        get_or_compute("key", self.compute(), 60, cache=self.cache)
+        self.assertEqual(get_or_compute("key", self.compute("new"), 60, cache=self.cache), "value")
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_entry_is_served_stale_while_another_caller_refreshes(self):
+        self.cache.set("key", CachedValue("old", time.time() - 1, 0.01))
+        self.cache.add("lock:key", 1)
+
+        self.assertEqual(get_or_compute("key", self.compute("new"), 60, cache=self.cache), "old")
+        self.assertEqual(self.calls, 0)
+
+        self.cache.delete("lock:key")
+        self.assertEqual(get_or_compute("key", self.compute("new"), 60, cache=self.cache), "new")
+        self.assertEqual(self.cache.get("key").value, "new")
+
+    def test_entries_near_expiry_may_be_refreshed_early(self):
+        self.cache.set("key", CachedValue("old", time.time() + 5, 1.0))
+        with patch("core.cache.random.random", return_value=0.5):
+            self.assertEqual(get_or_compute("key", self.compute("new"), 60, cache=self.cache), "old")
+        with patch("core.cache.random.random", return_value=0.999999):
+            self.assertEqual(get_or_compute("key", self.compute("new"), 60, cache=self.cache), "new")
+
+    def test_none_and_errors_are_not_cached_and_release_the_lock(self):
+        self.assertIsNone(get_or_compute("key", self.compute(None), 60, cache=self.cache))
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            get_or_compute("key", fail, 60, cache=self.cache)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertIsNone(self.cache.get("lock:key"))
@@ -0,0 +1,87 @@
+from rest_framework import throttling
+
+from .redis import get_redis_client
+
+
+# Token bucket holding `capacity` tokens that refill evenly over `period_ms`.
+# Returns {allowed, wait_ms}. Uses the Redis clock so every web node agrees.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local period_ms = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+local rate = capacity / period_ms
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait_ms = math.ceil((1 - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], period_ms)
+return {allowed, wait_ms}
+"""
+
+_token_bucket = None
+
+
+def _run_token_bucket(client, key, capacity, period_ms):
+    global _token_bucket
+    if _token_bucket is None:
+        _token_bucket = client.register_script(TOKEN_BUCKET_SCRIPT)
+    allowed, wait_ms = _token_bucket(keys=[key], args=[capacity, period_ms], client=client)
+    return bool(allowed), int(wait_ms)
+
+
+class RedisTokenBucketMixin:
+    """Checks the rate with one atomic Lua call instead of DRF's get/trim/set.
+
+    Scopes and rates still come from DEFAULT_THROTTLE_RATES. A rate of
+    `N/period` allows a burst of N requests and then refills N tokens per
+    period. Falls back to the regular cache-based throttle when the cache
+    is not backed by Redis (e.g. in tests).
+    """
+
+    redis_wait = None
+
+    def allow_request(self, request, view):
+        client = get_redis_client(self.cache)
+        if client is None or self.rate is None:
+            return super().allow_request(request, view)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, wait_ms = _run_token_bucket(
+            client, self.cache.make_key(self.key), self.num_requests, self.duration * 1000
+        )
+        self.redis_wait = wait_ms / 1000
+        return allowed
+
+    def wait(self):
+        if self.redis_wait is not None:
+            return self.redis_wait
+        return super().wait()
+
+
+class AnonRateThrottle(RedisTokenBucketMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(RedisTokenBucketMixin, throttling.UserRateThrottle):
+    pass
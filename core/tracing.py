@@ -0,0 +1,341 @@
+"""Minimal in-process tracing.
+
+A request or Celery task opens a local root span (`trace`); DB queries,
+cache calls and outgoing `requests` calls made inside it become child
+spans. The W3C `traceparent` header links spans across processes: it is
+read from incoming requests, added to outgoing HTTP calls and carried in
+Celery message headers. Finished traces are appended to TRACING_FILE as
+one JSON object per span and, when TRACING_COLLECTOR_URL is set, posted
+there in batches from a background thread.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from queue import Empty, Full, Queue
+from urllib.parse import urlsplit
+
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SERVER = 'server'
+CLIENT = 'client'
+CONSUMER = 'consumer'
+INTERNAL = 'internal'
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_CACHE_METHODS = ('get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many', 'incr', 'touch')
+
+_current = ContextVar('tracing_span', default=None)
+# spans finished under the current local root, exported when it ends
+_buffer = ContextVar('tracing_buffer', default=None)
+
+
+class Span:
+    def __init__(self, name, kind, trace_id, parent_id, sampled, attributes):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes
+        self.status = 'ok'
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def record_error(self, error):
+        self.status = 'error'
+        self.attributes['error.type'] = type(error).__name__
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._started
+
+    def as_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start': round(self.start, 6),
+            'duration_ms': round(self.duration * 1000, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+def parse_traceparent(value):
+    """`(trace_id, parent_span_id, sampled)` from a traceparent header, or None."""
+    match = _TRACEPARENT.match((value or '').strip().lower())
+    if match is None or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def format_traceparent(span):
+    return f'00-{span.trace_id}-{span.span_id}-{"01" if span.sampled else "00"}'
+
+
+@contextmanager
+def _activate(span, buffer=None):
+    token = _current.set(span)
+    buffer_token = _buffer.set(buffer) if buffer is not None else None
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        span.finish()
+        _current.reset(token)
+        if buffer_token is not None:
+            _buffer.reset(buffer_token)
+
+
+@contextmanager
+def span(name, kind=INTERNAL, **attributes):
+    """A child of the current span; does nothing outside a sampled trace."""
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    child = Span(name, kind, parent.trace_id, parent.span_id, True, attributes)
+    try:
+        with _activate(child):
+            yield child
+    finally:
+        buffer = _buffer.get()
+        if buffer is not None:
+            buffer.append(child)
+
+
+@contextmanager
+def trace(name, kind=SERVER, traceparent=None, **attributes):
+    """Opens a local root span and exports its trace when it ends.
+
+    It continues `traceparent` when given, nests as a plain span when a
+    trace is already active (e.g. an eager Celery task inside a request),
+    and otherwise starts a new trace sampled at TRACING_SAMPLE_RATE.
+    """
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    remote = parse_traceparent(traceparent)
+    if remote is None and _current.get() is not None:
+        with span(name, kind, **attributes) as nested:
+            yield nested
+        return
+
+    if remote is not None:
+        trace_id, parent_id, sampled = remote
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+    root = Span(name, kind, trace_id, parent_id, sampled, attributes)
+    buffer = []
+    try:
+        with _activate(root, buffer):
+            yield root
+    finally:
+        if sampled:
+            buffer.append(root)
+            export(buffer)
+
+
+# Export
+
+_file_lock = threading.Lock()
+_collector_lock = threading.Lock()
+_collector_queue = Queue(maxsize=10000)
+_collector_thread = None
+
+
+def export(spans):
+    records = [span.as_dict() for span in spans]
+    if settings.TRACING_FILE:
+        lines = ''.join(json.dumps(record, default=str) + '\n' for record in records)
+        with _file_lock, open(settings.TRACING_FILE, 'a') as output:
+            output.write(lines)
+    if settings.TRACING_COLLECTOR_URL:
+        _start_collector()
+        for record in records:
+            try:
+                _collector_queue.put_nowait(record)
+            except Full:
+                break
+
+
+def _start_collector():
+    global _collector_thread
+    with _collector_lock:
+        if _collector_thread is None or not _collector_thread.is_alive():
+            _collector_thread = threading.Thread(
+                target=_post_batches, name='tracing-collector', daemon=True
+            )
+            _collector_thread.start()
+
+
+def _post_batches():
+    # a new thread starts with an empty context, so these posts aren't traced
+    import requests
+
+    while True:
+        batch = [_collector_queue.get()]
+        try:
+            while len(batch) < 500:
+                batch.append(_collector_queue.get_nowait())
+        except Empty:
+            pass
+        try:
+            requests.post(settings.TRACING_COLLECTOR_URL, json={'spans': batch}, timeout=5)
+        except requests.RequestException as e:
+            logger.warning('Dropped %s spans: %s', len(batch), e)
+
+
+# Instrumentation
+
+def _trace_query(execute, sql, params, many, context):
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        return execute(sql, params, many, context)
+    with span(
+        'db.query',
+        CLIENT,
+        **{
+            'db.system': context['connection'].vendor,
+            'db.statement': sql[:1000],
+            'db.many': many,
+        },
+    ):
+        return execute(sql, params, many, context)
+
+
+def _add_query_hook(connection, **kwargs):
+    # outermost, and inserted at the front so `execute_wrapper` blocks that
+    # pop their own wrapper off the end are unaffected
+    if _trace_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _trace_query)
+
+
+def _traced_cache_method(name, original):
+    @wraps(original)
+    def method(self, *args, **kwargs):
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return original(self, *args, **kwargs)
+        attributes = {'cache.backend': type(self).__name__}
+        if args and isinstance(args[0], str):
+            attributes['cache.key'] = args[0]
+        with span(f'cache.{name}', CLIENT, **attributes):
+            return original(self, *args, **kwargs)
+
+    return method
+
+
+def _instrument_cache_class(cls):
+    if cls.__dict__.get('_tracing_instrumented'):
+        return
+    for name in _CACHE_METHODS:
+        setattr(cls, name, _traced_cache_method(name, getattr(cls, name)))
+    cls._tracing_instrumented = True
+
+
+def _instrument_requests():
+    try:
+        import requests
+    except ImportError:
+        return
+    session_class = requests.Session
+    if session_class.__dict__.get('_tracing_instrumented'):
+        return
+    original_send = session_class.send
+
+    def send(self, request, **kwargs):
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return original_send(self, request, **kwargs)
+        url = urlsplit(request.url)
+        with span(
+            f'HTTP {request.method} {url.hostname}',
+            CLIENT,
+            **{
+                'http.method': request.method,
+                'http.url': f'{url.scheme}://{url.netloc}{url.path}',
+            },
+        ) as client_span:
+            request.headers['traceparent'] = format_traceparent(client_span)
+            response = original_send(self, request, **kwargs)
+            client_span.set(**{'http.status_code': response.status_code})
+            if response.status_code >= 500:
+                client_span.status = 'error'
+            return response
+
+    session_class.send = send
+    session_class._tracing_instrumented = True
+
+
+def install():
+    """Hooks DB connections, the configured cache backends and `requests`."""
+    connection_created.connect(_add_query_hook, dispatch_uid='core.tracing')
+    for connection in connections.all(initialized_only=True):
+        _add_query_hook(connection)
+    for config in settings.CACHES.values():
+        _instrument_cache_class(import_string(config['BACKEND']))
+    _instrument_requests()
+
+
+# Celery: the publishing span travels in the message headers.
+
+_task_traces = {}
+
+
+@before_task_publish.connect
+def _inject_traceparent(headers=None, **kwargs):
+    current = _current.get()
+    if headers is not None and current is not None:
+        headers['traceparent'] = format_traceparent(current)
+
+
+@task_prerun.connect
+def _start_task_trace(task_id=None, task=None, **kwargs):
+    context = trace(
+        task.name,
+        CONSUMER,
+        traceparent=getattr(task.request, 'traceparent', None),
+        **{'celery.task_id': task_id},
+    )
+    context.__enter__()
+    _task_traces[task_id] = context
+
+
+@task_postrun.connect
+def _finish_task_trace(task_id=None, state=None, **kwargs):
+    context = _task_traces.pop(task_id, None)
+    if context is None:
+        return
+    task_span = _current.get()
+    if task_span is not None:
+        task_span.set(**{'celery.state': state})
+        if state == 'FAILURE':
+            task_span.status = 'error'
+    context.__exit__(None, None, None)
@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
 
-# Create your views here.
+from .metrics import render_latest
+
+
+def metrics(request):
+    """Prometheus text exposition of this host's web process metrics.
+
+    Closed by default: open to staff sessions and, when METRICS_AUTH_TOKEN
+    is set, to `Authorization: Bearer <token>` (for the scraper).
+    """
+    token = settings.METRICS_AUTH_TOKEN
+    has_token = bool(token) and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    )
+    if not (has_token or request.user.is_staff):
+        return HttpResponseForbidden()
+    body, content_type = render_latest()
+    return HttpResponse(body, content_type=content_type)
@@ -1,8 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
 
 from accounts.admin_utils import is_seller, is_superadmin, is_admin
 
 from .models import Cart, CartItem, Order, OrderItem, Payment
+from .services import InsufficientStock, change_order_status
 
 
 class CartItemInline(admin.TabularInline):
@@ -46,33 +49,45 @@ class OrderItemInline(admin.TabularInline):
     show_change_link = True
 
 
+def _change_status(modeladmin, request, queryset, new_status, message):
+    try:
+        changed = change_order_status(queryset, new_status)
+    except InsufficientStock as e:
+        modeladmin.message_user(request, str(e), level=messages.ERROR)
+        return
+    modeladmin.message_user(request, message.format(count=len(changed)))
+
+
 @admin.action(description='Approve selected orders (Processing)')
 def make_processing(modeladmin, request, queryset):
-    queryset.update(status=Order.PROCESSING)
+    _change_status(
+        modeladmin, request, queryset, Order.PROCESSING,
+        '{count} orders marked as processing.',
+    )
 
 
 @admin.action(description='Cancel selected orders')
 def make_cancelled(modeladmin, request, queryset):
-    for order in queryset:
-        if order.status != Order.CANCELLED:
-            order.status = Order.CANCELLED
-            order.save()
-            for item in order.orderitem_order.all():
-                item.store_item.stock += item.quantity
-                item.store_item.save()
-    modeladmin.message_user(
-        request, 'Selected orders have been cancelled and stock restored.'
+    _change_status(
+        modeladmin, request, queryset, Order.CANCELLED,
+        '{count} orders have been cancelled and stock restored.',
     )
 
 
 @admin.action(description='Mark selected orders as pending')
 def make_pending(modeladmin, request, queryset):
-    queryset.update(status=Order.PENDING)
+    _change_status(
+        modeladmin, request, queryset, Order.PENDING,
+        '{count} orders marked as pending.',
+    )
 
 
 @admin.action(description='Mark selected orders as delivered')
 def make_delivered(modeladmin, request, queryset):
-    queryset.update(status=Order.DELIVERED)
+    _change_status(
+        modeladmin, request, queryset, Order.DELIVERED,
+        '{count} orders marked as delivered.',
+    )
 
 
 @admin.register(Order)
@@ -113,23 +128,16 @@ class OrderItemAdmin(admin.ModelAdmin):
 
 @admin.action(description='Mark selected payments as Successful')
 def mark_payments_success(modeladmin, request, queryset):
-    queryset.update(status=Payment.SUCCESS)
+    queryset.update(status=Payment.SUCCESS, updated_at=timezone.now())
 
 
 @admin.action(description='Mark selected payments as Failed')
+@transaction.atomic
 def mark_payments_failed(modeladmin, request, queryset):
-    for payment in queryset:
-        payment.status = Payment.FAILED
-        payment.save()
-
-        order = payment.order
-        if order.status != Order.CANCELLED:
-            order.status = Order.CANCELLED
-            order.save()
-
-            for item in order.orderitem_order.all():
-                item.store_item.stock += item.quantity
-                item.store_item.save()
+    order_ids = list(queryset.order_by().values_list('order_id', flat=True))
+    # orders before payments, the same lock order as verify and cancel_orders
+    change_order_status(order_ids, Order.CANCELLED)
+    queryset.update(status=Payment.FAILED, updated_at=timezone.now())
     modeladmin.message_user(
         request, 'Selected payments failed; orders cancelled and stock restored.'
     )
@@ -137,7 +145,7 @@ def mark_payments_failed(modeladmin, request, queryset):
 
 @admin.action(description='Mark selected payments as Pending')
 def mark_payments_pending(modeladmin, request, queryset):
-    queryset.update(status=Payment.PENDING)
+    queryset.update(status=Payment.PENDING, updated_at=timezone.now())
 
 
 @admin.register(Payment)
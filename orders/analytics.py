@@ -0,0 +1,169 @@
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import OrderItem, Payment, SellerSalesRollup, StoreItemSalesRollup
+
+ROLLUP_BATCH_SIZE = 500
+
+HOUR = SellerSalesRollup.HOUR
+DAY = SellerSalesRollup.DAY
+
+
+def truncate(value, period):
+    value = value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if period == DAY:
+        value = value.replace(hour=0)
+    return value
+
+
+def _upsert(model, conflict_columns, insert_columns, increment_columns, rows):
+    """Adds `rows` onto existing rollup rows with one INSERT ... ON CONFLICT statement.
+
+    Each row holds the conflict, insert-only and increment columns in that order.
+    """
+    if not rows:
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [
+        quote(column) for column in conflict_columns + insert_columns + increment_columns
+    ]
+    increments = ', '.join(
+        f'{quote(column)} = {table}.{quote(column)} + excluded.{quote(column)}'
+        for column in increment_columns
+    )
+    sql = (
+        f'INSERT INTO {table} ({", ".join(columns)}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({", ".join(columns[: len(conflict_columns)])}) '
+        f'DO UPDATE SET {increments}'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+@transaction.atomic
+def rollup_sales_batch(batch_size=ROLLUP_BATCH_SIZE):
+    """Folds one batch of successful, not yet rolled up payments into the rollup tables."""
+    payments = list(
+        Payment.objects.select_for_update(skip_locked=True)
+        .filter(status=Payment.SUCCESS, rolled_up_at__isnull=True)
+        .order_by('id')
+        .values_list('id', 'order_id')[:batch_size]
+    )
+    if not payments:
+        return 0
+
+    seller_totals = defaultdict(lambda: [Decimal('0'), 0, set()])
+    item_totals = defaultdict(lambda: [Decimal('0'), 0])
+
+    items = OrderItem.objects.filter(
+        order_id__in={order_id for _, order_id in payments}
+    ).values_list(
+        'order_id',
+        'order__created_at',
+        'store_item_id',
+        'store_item__store__seller_id',
+        'price',
+        'quantity',
+    )
+    for order_id, created_at, store_item_id, seller_id, price, quantity in items.iterator():
+        revenue = price * quantity
+        for period in (HOUR, DAY):
+            bucket = truncate(created_at, period)
+
+            seller_total = seller_totals[(seller_id, period, bucket)]
+            seller_total[0] += revenue
+            seller_total[1] += quantity
+            seller_total[2].add(order_id)
+
+            item_total = item_totals[(store_item_id, period, bucket, seller_id)]
+            item_total[0] += revenue
+            item_total[1] += quantity
+
+    ops = connection.ops
+    _upsert(
+        SellerSalesRollup,
+        ['seller_id', 'period', 'bucket'],
+        [],
+        ['revenue', 'units', 'order_count'],
+        [
+            (
+                seller_id,
+                period,
+                ops.adapt_datetimefield_value(bucket),
+                ops.adapt_decimalfield_value(revenue),
+                units,
+                len(orders),
+            )
+            for (seller_id, period, bucket), (revenue, units, orders) in seller_totals.items()
+        ],
+    )
+    _upsert(
+        StoreItemSalesRollup,
+        ['store_item_id', 'period', 'bucket'],
+        ['seller_id'],
+        ['revenue', 'units'],
+        [
+            (
+                store_item_id,
+                period,
+                ops.adapt_datetimefield_value(bucket),
+                seller_id,
+                ops.adapt_decimalfield_value(revenue),
+                units,
+            )
+            for (store_item_id, period, bucket, seller_id), (revenue, units) in item_totals.items()
+        ],
+    )
+
+    Payment.objects.filter(id__in=[payment_id for payment_id, _ in payments]).update(
+        rolled_up_at=timezone.now()
+    )
+    return len(payments)
+
+
+def get_seller_analytics(seller, period, start, end, top=5):
+    """Reads seller dashboards from the rollup tables only; `end` is exclusive."""
+    rollups = SellerSalesRollup.objects.filter(
+        seller=seller, period=period, bucket__gte=start, bucket__lt=end
+    ).order_by('bucket')
+
+    series = list(rollups.values('bucket', 'revenue', 'units', 'order_count'))
+    totals = {
+        'revenue': sum((row['revenue'] for row in series), Decimal('0')),
+        'units': sum(row['units'] for row in series),
+        'order_count': sum(row['order_count'] for row in series),
+    }
+
+    top_items = list(
+        StoreItemSalesRollup.objects.filter(
+            seller=seller, period=DAY, bucket__gte=truncate(start, DAY), bucket__lt=end
+        )
+        .values('store_item_id', 'store_item__product__name')
+        .annotate(revenue=Sum('revenue'), units=Sum('units'))
+        .order_by('-revenue', 'store_item_id')[:top]
+    )
+
+    return {
+        'period': period,
+        'start': start,
+        'end': end,
+        'totals': totals,
+        'series': series,
+        'top_items': [
+            {
+                'store_item_id': item['store_item_id'],
+                'product_name': item['store_item__product__name'],
+                'revenue': item['revenue'],
+                'units': item['units'],
+            }
+            for item in top_items
+        ],
+    }
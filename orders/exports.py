@@ -0,0 +1,78 @@
+import csv
+import json
+
+from .models import Order, OrderItem
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+EXPORT_FORMATS = [CSV, NDJSON]
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = [
+    ('order_id', 'order_id'),
+    ('order_created_at', 'order__created_at'),
+    ('order_status', 'order__status'),
+    ('customer_email', 'order__customer__email'),
+    ('order_total_price', 'order__total_price'),
+    ('order_total_discount', 'order__total_discount'),
+    ('item_id', 'id'),
+    ('store_item_id', 'store_item_id'),
+    ('store_name', 'store_item__store__name'),
+    ('product_name', 'store_item__product__name'),
+    ('quantity', 'quantity'),
+    ('price', 'price'),
+]
+# whole-order values that would leak other sellers' lines and the customer
+STAFF_ONLY_COLUMNS = {'customer_email', 'order_total_price', 'order_total_discount'}
+
+STATUS_LABELS = dict(Order.ORDER_STATUS)
+
+
+def get_export_fields(seller=None):
+    if seller is None:
+        return EXPORT_FIELDS
+    return [(column, lookup) for column, lookup in EXPORT_FIELDS if column not in STAFF_ONLY_COLUMNS]
+
+
+def get_export_columns(seller=None):
+    return [column for column, _ in get_export_fields(seller)] + ['line_total']
+
+
+def get_export_rows(orders, seller=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Streams one row per order item; sellers only see their own items."""
+    items = OrderItem.objects.filter(order__in=orders.values('id'))
+    fields = get_export_fields(seller)
+    if seller is not None:
+        items = items.filter(store_item__store__seller=seller)
+
+    columns = [column for column, _ in fields]
+    rows = items.order_by('order_id', 'id').values_list(*[lookup for _, lookup in fields])
+    for values in rows.iterator(chunk_size=chunk_size):
+        row = dict(zip(columns, values))
+        row['order_created_at'] = row['order_created_at'].isoformat()
+        row['order_status'] = STATUS_LABELS.get(row['order_status'], row['order_status'])
+        row['line_total'] = row['price'] * row['quantity']
+        yield row
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([row[column] for column in columns])
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + '\n'
+
+
+def render_export(rows, export_format, seller=None):
+    if export_format == CSV:
+        return iter_csv(rows, get_export_columns(seller))
+    return iter_ndjson(rows)
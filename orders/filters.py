@@ -5,8 +5,9 @@ from .models import Order
 
 class OrderFilter(filters.FilterSet):
     status = filters.ChoiceFilter(choices=Order.ORDER_STATUS)
-    date_from = filters.DateFilter(field_name='created_at', lookup_expr='gte')
-    date_to = filters.DateFilter(field_name='created_at', lookup_expr='lte')
+    # compare calendar days so date_to includes the whole day it names
+    date_from = filters.DateFilter(field_name='created_at', lookup_expr='date__gte')
+    date_to = filters.DateFilter(field_name='created_at', lookup_expr='date__lte')
 
     class Meta:
         model = Order
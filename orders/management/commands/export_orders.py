@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.exports import EXPORT_FORMATS, NDJSON, get_export_rows, render_export
+from orders.filters import OrderFilter
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Stream orders with their items as CSV or NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date-from', help='Include orders created on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--date-to', help='Include orders created on or before this date (YYYY-MM-DD).')
+        parser.add_argument('--status', help='Only export orders with this status code.')
+        parser.add_argument('--seller', help='Only export items sold by this seller (email).')
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default=NDJSON)
+        parser.add_argument('--output', help='Output file path (defaults to stdout).')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        seller = None
+        if options['seller']:
+            try:
+                seller = get_user_model().objects.get(email=options['seller'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Seller {options["seller"]} does not exist.')
+            orders = orders.filter(orderitem_order__store_item__store__seller=seller)
+
+        data = {
+            key: options[key]
+            for key in ('date_from', 'date_to', 'status')
+            if options[key]
+        }
+        order_filter = OrderFilter(data, queryset=orders)
+        if not order_filter.is_valid():
+            raise CommandError(order_filter.errors.as_text())
+
+        rows = get_export_rows(order_filter.qs, seller=seller)
+        chunks = render_export(rows, options['export_format'], seller=seller)
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', newline='') as output:
+            output.writelines(chunks)
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from orders.stress import CheckoutStress
+
+
+class Command(BaseCommand):
+    help = 'Race concurrent add-to-cart and checkout flows for hot items and check stock stays consistent.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Customers, one flow each.')
+        parser.add_argument('--workers', type=int, default=32, help='Threads running flows.')
+        parser.add_argument('--stock', type=int, default=100, help='Initial stock of each hot item.')
+        parser.add_argument('--quantity', type=int, default=1, help='Units of each item per cart.')
+        parser.add_argument('--hot-items', type=int, default=1, help='Items every cart contains.')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--output', help='Also write the report as JSON to this path.')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated rows.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'stress_checkout needs PostgreSQL; SQLite serializes writers, '
+                'so row locks and deadlocks cannot be observed.'
+            )
+
+        stress = CheckoutStress(
+            users=options['users'],
+            workers=options['workers'],
+            stock=options['stock'],
+            quantity=options['quantity'],
+            hot_items=options['hot_items'],
+            seed=options['seed'],
+        )
+        try:
+            report = stress.run()
+        finally:
+            if not options['keep']:
+                stress.cleanup()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+        for key, value in report.items():
+            if key != 'items':
+                self.stdout.write(f'{key}: {value}')
+        for item in report['items']:
+            self.stdout.write(
+                f'store item {item["id"]}: {item["initial_stock"]} initial = '
+                f'{item["final_stock"]} left + {item["units_sold"]} sold '
+                f'[{"ok" if item["ok"] else "VIOLATED"}]'
+            )
+
+        if not report['invariant_ok']:
+            raise CommandError('Stock invariant violated: initial != final + sold.')
+        self.stdout.write(self.style.SUCCESS('Stock invariant holds.'))
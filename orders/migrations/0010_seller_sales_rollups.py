@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_alter_order_address_alter_order_customer'),
+        ('stores', '0003_rename_store_storeitem_store'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StoreItemSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='rolled_up_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('rolled_up_at__isnull', True), ('status', 1)), fields=['id'], name='payment_pending_rollup_idx'),
+        ),
+        migrations.AddField(
+            model_name='sellersalesrollup',
+            name='seller',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salesrollup_seller', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='storeitemsalesrollup',
+            name='seller',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itemsalesrollup_seller', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='storeitemsalesrollup',
+            name='store_item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salesrollup_storeitem', to='stores.storeitem'),
+        ),
+        migrations.AddConstraint(
+            model_name='sellersalesrollup',
+            constraint=models.UniqueConstraint(fields=('seller', 'period', 'bucket'), name='unique_seller_sales_bucket'),
+        ),
+        migrations.AddIndex(
+            model_name='storeitemsalesrollup',
+            index=models.Index(fields=['seller', 'period', 'bucket'], name='itemsales_seller_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='storeitemsalesrollup',
+            constraint=models.UniqueConstraint(fields=('store_item', 'period', 'bucket'), name='unique_item_sales_bucket'),
+        ),
+    ]
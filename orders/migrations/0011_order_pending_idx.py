@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_address_is_default'),
+        ('orders', '0010_seller_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['id'], name='order_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:25
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_cart_activity(apps, schema_editor):
+    Cart = apps.get_model('orders', 'Cart')
+    CartItem = apps.get_model('orders', 'CartItem')
+
+    items = (
+        CartItem.objects.filter(cart=OuterRef('pk'), is_deleted=False)
+        .order_by()
+        .values('cart')
+    )
+    Cart.objects.update(
+        item_count=Coalesce(
+            Subquery(items.annotate(count=Count('id')).values('count')), 0
+        ),
+        last_activity_at=Coalesce(
+            Subquery(items.annotate(latest=Max('updated_at')).values('latest')),
+            'updated_at',
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_order_pending_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['last_activity_at', 'item_count'], name='cart_activity_idx'),
+        ),
+        migrations.RunPython(backfill_cart_activity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0012_cart_activity'),
+        ('stores', '0004_storeitem_live_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['cart'], name='cartitem_live_cart_idx'),
+        ),
+    ]
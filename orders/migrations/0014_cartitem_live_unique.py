@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:35
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.utils import timezone
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    """Folds duplicate live lines into the oldest one before the constraint exists."""
+    CartItem = apps.get_model('orders', 'CartItem')
+
+    duplicates = (
+        CartItem.objects.filter(is_deleted=False)
+        .values('cart_id', 'store_item_id')
+        .annotate(lines=Count('id'), keep_id=Min('id'), total=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    now = timezone.now()
+    for duplicate in duplicates.iterator():
+        lines = CartItem.objects.filter(
+            cart_id=duplicate['cart_id'],
+            store_item_id=duplicate['store_item_id'],
+            is_deleted=False,
+        )
+        lines.filter(id=duplicate['keep_id']).update(quantity=duplicate['total'], updated_at=now)
+        lines.exclude(id=duplicate['keep_id']).update(is_deleted=True, deleted_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_cartitem_live_index'),
+        ('stores', '0004_storeitem_live_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('cart', 'store_item'), name='cartitem_live_unique'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_address_user_default_idx'),
+        ('orders', '0014_cartitem_live_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['customer', '-created_at'], name='order_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['order', 'status'], name='payment_order_status_idx'),
+        ),
+    ]
@@ -7,9 +7,22 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Meta can't see the model's own class attributes, so the statuses that the
+# partial indexes below are built on live here
+ORDER_PENDING = 1
+PAYMENT_SUCCESS = 1
+
 class Cart(BaseModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart_user')
     total_discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    reminded_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_activity_at', 'item_count'], name='cart_activity_idx'),
+        ]
 
     def total_price(self):
         subtotal = sum(item.total_price for item in self.cartitem_cart.all())
@@ -25,6 +38,19 @@ class CartItem(BaseModel):
     store_item = models.ForeignKey(StoreItem, on_delete=models.CASCADE, related_name='cartitem_storeitem')
     quantity = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cart', 'store_item'],
+                condition=models.Q(is_deleted=False),
+                name='cartitem_live_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['cart'], condition=models.Q(is_deleted=False), name='cartitem_live_cart_idx'
+            ),
+        ]
 
     @property
     def total_price(self):
@@ -38,7 +64,7 @@ class CartItem(BaseModel):
 
 
 class Order(BaseModel):
-    PENDING = 1
+    PENDING = ORDER_PENDING
     PROCESSING = 2
     DELIVERED = 3
     CANCELLED = 4
@@ -59,6 +85,22 @@ class Order(BaseModel):
     total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total_discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['customer', '-created_at'],
+                condition=models.Q(is_deleted=False),
+                name='order_customer_created_idx',
+            ),
+            models.Index(
+                fields=['id'],
+                # the unpaid-order expiry walks pending orders in id order; they
+                # are a small slice of the table, so only they are indexed
+                condition=models.Q(status=ORDER_PENDING),
+                name='order_pending_idx',
+            ),
+        ]
+
     def __str__(self):
         return f'Order #{self.id} - {self.customer.email}'
 
@@ -79,7 +121,7 @@ class OrderItem(BaseModel):
 
 class Payment(BaseModel):
     PENDING = 0
-    SUCCESS = 1
+    SUCCESS = PAYMENT_SUCCESS
     FAILED = 2
 
     PAYMENT_STATUS = [(PENDING,'Pending'), (SUCCESS,'Success'), (FAILED,'Failed')]
@@ -90,10 +132,71 @@ class Payment(BaseModel):
     reference_id = models.CharField(max_length=50, blank=True, null=True)
     card_pan = models.CharField(max_length=20, blank=True, null=True)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='payment_order')
+    rolled_up_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['order', 'status'],
+                condition=models.Q(is_deleted=False),
+                name='payment_order_status_idx',
+            ),
+            models.Index(
+                fields=['id'],
+                # the sales rollup walks successful payments it hasn't folded in
+                # yet, in id order; rolled up rows drop out of the index
+                condition=models.Q(status=PAYMENT_SUCCESS, rolled_up_at__isnull=True),
+                name='payment_pending_rollup_idx',
+            ),
+        ]
 
     @property
     def net_amount(self):
         return max((self.amount or 0) - (self.fee or 0), 0)
     
     def __str__(self):
-        return f'Payment for order #{self.order.id} - {self.get_status_display()}'
\ No newline at end of file
+        return f'Payment for order #{self.order.id} - {self.get_status_display()}'
+
+class SellerSalesRollup(models.Model):
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIODS = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='salesrollup_seller')
+    period = models.CharField(max_length=4, choices=PERIODS)
+    bucket = models.DateTimeField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['seller', 'period', 'bucket'], name='unique_seller_sales_bucket'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.seller_id} {self.period} {self.bucket:%Y-%m-%d %H:00}'
+
+
+class StoreItemSalesRollup(models.Model):
+    seller = models.ForeignKey(User, on_delete=models.CASCADE, related_name='itemsalesrollup_seller')
+    store_item = models.ForeignKey(StoreItem, on_delete=models.CASCADE, related_name='salesrollup_storeitem')
+    period = models.CharField(max_length=4, choices=SellerSalesRollup.PERIODS)
+    bucket = models.DateTimeField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['store_item', 'period', 'bucket'], name='unique_item_sales_bucket'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'period', 'bucket'], name='itemsales_seller_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.store_item_id} {self.period} {self.bucket:%Y-%m-%d %H:00}'
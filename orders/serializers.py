@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 from django.forms.models import model_to_dict
+from django.utils import timezone
 from drf_spectacular.utils import OpenApiExample, extend_schema_serializer
 from rest_framework import serializers
 
@@ -6,7 +9,7 @@ from accounts.models import Address
 from products.models import ProductImage
 from stores.models import StoreItem
 
-from .models import Cart, CartItem, Order, OrderItem
+from .models import Cart, CartItem, Order, OrderItem, SellerSalesRollup
 
 
 class ImageSerializer(serializers.ModelSerializer):
@@ -228,3 +231,31 @@ class PaymentVerifySerializer(serializers.Serializer):
     detail = serializers.CharField(read_only=True)
     ref_id = serializers.CharField(read_only=True, required=False)
     zarinpal_response = serializers.JSONField(read_only=True, required=False)
+
+
+class SellerAnalyticsQuerySerializer(serializers.Serializer):
+    MAX_DAYS = {SellerSalesRollup.HOUR: 31, SellerSalesRollup.DAY: 366}
+
+    period = serializers.ChoiceField(
+        choices=SellerSalesRollup.PERIODS, default=SellerSalesRollup.DAY
+    )
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    top = serializers.IntegerField(min_value=1, max_value=50, default=5)
+    seller_id = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        date_to = attrs.get('date_to') or timezone.now().date()
+        date_from = attrs.get('date_from') or date_to - timedelta(days=29)
+        if date_from > date_to:
+            raise serializers.ValidationError('date_from must be before date_to.')
+
+        max_days = self.MAX_DAYS[attrs['period']]
+        if (date_to - date_from).days >= max_days:
+            raise serializers.ValidationError(
+                f'The {attrs["period"]} window can span at most {max_days} days.'
+            )
+
+        attrs['date_from'] = date_from
+        attrs['date_to'] = date_to
+        return attrs
@@ -0,0 +1,201 @@
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from stores.models import StoreItem
+
+from .models import Cart, CartItem, Order, OrderItem, Payment
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+def touch_cart(cart):
+    """Refreshes the cart's item count and activity stamp in one UPDATE."""
+    now = timezone.now()
+    item_count = Coalesce(
+        Subquery(
+            CartItem.objects.filter(cart=OuterRef('pk'))
+            .order_by()
+            .values('cart')
+            .annotate(count=Count('id'))
+            .values('count')
+        ),
+        0,
+    )
+    Cart.objects.filter(pk=cart.pk).update(
+        item_count=item_count, last_activity_at=now, updated_at=now
+    )
+
+
+# the conflict target must repeat the `cartitem_live_unique` condition
+UPSERT_CART_ITEM_SQL = """
+    INSERT INTO {table} (cart_id, store_item_id, quantity, is_deleted, created_at, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (cart_id, store_item_id) WHERE NOT is_deleted
+    DO UPDATE SET quantity = {table}.quantity + excluded.quantity, updated_at = excluded.updated_at
+    WHERE {table}.quantity + excluded.quantity <= %s
+    RETURNING quantity
+"""
+
+
+def add_cart_item(cart, store_item, quantity):
+    """Adds `quantity` units of `store_item` to the cart's line for it.
+
+    Creates the line or increments it in a single INSERT ... ON CONFLICT
+    statement. Returns the line's new quantity, or None (leaving the line
+    alone) when the total would exceed `store_item.stock`. Databases
+    without conflict targets or RETURNING use an insert-then-update path.
+    """
+    features = connection.features
+    if not (
+        features.supports_update_conflicts_with_target
+        and features.can_return_columns_from_insert
+    ):
+        return _add_cart_item_without_upsert(cart, store_item, quantity)
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_CART_ITEM_SQL.format(table=connection.ops.quote_name(CartItem._meta.db_table)),
+            [cart.pk, store_item.pk, quantity, False, now, now, store_item.stock],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _add_cart_item_without_upsert(cart, store_item, quantity):
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(cart=cart, store_item=store_item, quantity=quantity)
+        return quantity
+    except IntegrityError:
+        pass
+
+    line = CartItem.objects.filter(cart=cart, store_item=store_item)
+    updated = line.filter(quantity__lte=store_item.stock - quantity).update(
+        quantity=F('quantity') + quantity, updated_at=timezone.now()
+    )
+    if not updated:
+        return None
+    return line.values_list('quantity', flat=True).get()
+
+
+def _order_ids(orders):
+    if isinstance(orders, QuerySet):
+        return orders.order_by().values('id')
+    return list(orders)
+
+
+def _quantities_by_store_item(order_ids):
+    """Correlated subquery: units of the outer store item across `order_ids`."""
+    return Coalesce(
+        Subquery(
+            OrderItem.objects.filter(order_id__in=order_ids, store_item=OuterRef('pk'))
+            .order_by()
+            .values('store_item')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def _store_items_of(order_ids):
+    return StoreItem.all_objects.filter(
+        id__in=OrderItem.objects.filter(order_id__in=order_ids).values('store_item_id')
+    )
+
+
+def restore_stock(order_ids):
+    """Returns the units of `order_ids` to stock in one UPDATE ... SET stock = stock + qty."""
+    return _store_items_of(order_ids).update(
+        stock=F('stock') + _quantities_by_store_item(order_ids), updated_at=timezone.now()
+    )
+
+
+def reserve_stock(order_ids):
+    """Takes the units of `order_ids` out of stock, or raises InsufficientStock."""
+    store_items = _store_items_of(order_ids)
+    list(store_items.select_for_update().order_by('id').values_list('id', flat=True))
+
+    short = store_items.annotate(needed=_quantities_by_store_item(order_ids)).filter(
+        stock__lt=F('needed')
+    )
+    names = list(short.values_list('product__name', flat=True)[:5])
+    if names:
+        raise InsufficientStock(f'Not enough stock for: {", ".join(names)}')
+
+    return store_items.update(
+        stock=F('stock') - _quantities_by_store_item(order_ids), updated_at=timezone.now()
+    )
+
+
+@transaction.atomic
+def change_order_status(orders, new_status, from_statuses=None):
+    """Moves `orders` (a queryset or order ids) to `new_status` with set-based statements.
+
+    Cancelling returns stock, moving a cancelled order back to an active
+    status takes it out again. `from_statuses` limits the change to orders
+    that are still in one of those statuses once locked. Returns the ids of
+    the orders that changed.
+    """
+    locked = Order.objects.select_for_update().filter(id__in=_order_ids(orders))
+    if from_statuses is not None:
+        locked = locked.filter(status__in=from_statuses)
+    changing = list(locked.exclude(status=new_status).values_list('id', 'status'))
+    if not changing:
+        return []
+
+    order_ids = [order_id for order_id, _ in changing]
+    if new_status == Order.CANCELLED:
+        restore_stock(order_ids)
+    else:
+        reactivated = [
+            order_id for order_id, status in changing if status == Order.CANCELLED
+        ]
+        if reactivated:
+            reserve_stock(reactivated)
+
+    Order.objects.filter(id__in=order_ids).update(
+        status=new_status, updated_at=timezone.now()
+    )
+    return order_ids
+
+
+@transaction.atomic
+def cancel_orders(orders, from_statuses=None):
+    """Cancels `orders`, returns their stock and fails their pending payments."""
+    order_ids = change_order_status(orders, Order.CANCELLED, from_statuses=from_statuses)
+    if order_ids:
+        Payment.objects.filter(order_id__in=order_ids, status=Payment.PENDING).update(
+            status=Payment.FAILED, updated_at=timezone.now()
+        )
+    return order_ids
+
+
+def expire_unpaid_orders(deadline, batch_size=200, max_batches=50):
+    """Cancels pending orders created before `deadline` that were never paid.
+
+    The backlog is walked in id order (keyset pagination), one transaction
+    per batch, so a large backlog never holds locks or scans for long.
+    """
+    expired = 0
+    last_id = 0
+    for _ in range(max_batches):
+        order_ids = list(
+            Order.objects.filter(
+                status=Order.PENDING, created_at__lt=deadline, id__gt=last_id
+            )
+            .exclude(payment_order__status=Payment.SUCCESS)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            break
+
+        last_id = order_ids[-1]
+        expired += len(cancel_orders(order_ids, from_statuses=[Order.PENDING]))
+    return expired
@@ -0,0 +1,215 @@
+import random
+import threading
+import time
+from collections import Counter
+from queue import Empty, Queue
+from uuid import uuid4
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DatabaseError, connection, connections
+from django.db.models import Sum
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import Address
+from core.benchmark import benchmark_environment, percentile
+from products.models import Category, Product
+from stores.models import Store, StoreItem
+
+from .models import OrderItem
+
+DEADLOCK_SQLSTATE = '40P01'
+
+CHECKED_OUT = 'checked_out'
+SOLD_OUT = 'sold_out'
+DEADLOCK = 'deadlock'
+ERROR = 'error'
+
+
+def is_deadlock(error):
+    cause = error.__cause__ or error
+    # psycopg 3 exposes `sqlstate`, psycopg2 `pgcode`
+    code = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)
+    return code == DEADLOCK_SQLSTATE or 'deadlock detected' in str(error)
+
+
+def lock_wait_sample():
+    return (
+        REGISTRY.get_sample_value('checkout_lock_wait_seconds_sum') or 0.0,
+        REGISTRY.get_sample_value('checkout_lock_wait_seconds_count') or 0.0,
+    )
+
+
+class CheckoutStress:
+    """Many customers racing `add_to_cart` and `checkout` for a few hot items.
+
+    Each of `users` customers adds every hot item (in a random order, so
+    multi-item carts can deadlock) and checks out, spread over `workers`
+    threads with one database connection each. Afterwards every hot item
+    must satisfy: initial stock == final stock + units sold.
+    """
+
+    def __init__(self, users=200, workers=32, stock=100, quantity=1, hot_items=1, seed=None):
+        self.users = users
+        self.workers = workers
+        self.stock = stock
+        self.quantity = quantity
+        self.hot_items = hot_items
+        self.random = random.Random(seed)
+        self.tag = uuid4().hex[:8]
+        self.lock = threading.Lock()
+        self.outcomes = Counter()
+        self.latencies = []
+        self.seller = self.store = self.category = None
+        self.store_items = []
+        self.customers = []
+
+    def setup(self):
+        User = get_user_model()
+        self.seller = User.objects.create_user(
+            email=f'{self.tag}-stress-seller@example.com', password=None, role='seller'
+        )
+        self.store = Store.objects.create(name=f'Stress {self.tag}', seller=self.seller)
+        self.category = Category.objects.create(name=f'Stress {self.tag}', description='')
+        self.products = Product.objects.bulk_create([
+            Product(name=f'Hot item {number}', category=self.category)
+            for number in range(self.hot_items)
+        ])
+        self.store_items = StoreItem.objects.bulk_create([
+            StoreItem(product=product, store=self.store, price=100, stock=self.stock)
+            for product in self.products
+        ])
+        password = make_password(None)
+        self.customers = User.objects.bulk_create([
+            User(email=f'{self.tag}-stress-{number}@example.com', password=password)
+            for number in range(self.users)
+        ])
+        self.addresses = {
+            address.user_id: address.id
+            for address in Address.objects.bulk_create([
+                Address(
+                    user=user,
+                    label='Stress',
+                    address_line_1='Stress',
+                    city='Tehran',
+                    state='Tehran',
+                    country='Iran',
+                    postal_code='00000',
+                )
+                for user in self.customers
+            ])
+        }
+
+    def flow(self, user, order):
+        """One customer: add the hot items, then check out; returns the outcome."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        for store_item in order:
+            response = client.post(
+                reverse('mycart-add-to-cart'),
+                {'store_item_id': store_item.id, 'quantity': self.quantity},
+                format='json',
+            )
+            if response.status_code == 400:
+                return SOLD_OUT
+        started = time.perf_counter()
+        response = client.post(
+            reverse('orders-checkout'), {'address_id': self.addresses[user.id]}, format='json'
+        )
+        with self.lock:
+            self.latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code == 201:
+            return CHECKED_OUT
+        if response.status_code == 400:
+            return SOLD_OUT
+        return ERROR
+
+    def worker(self, queue):
+        try:
+            while True:
+                try:
+                    user, order = queue.get_nowait()
+                except Empty:
+                    return
+                try:
+                    outcome = self.flow(user, order)
+                except DatabaseError as e:
+                    outcome = DEADLOCK if is_deadlock(e) else ERROR
+                with self.lock:
+                    self.outcomes[outcome] += 1
+        finally:
+            connections.close_all()
+
+    def run(self):
+        with benchmark_environment():
+            self.setup()
+            queue = Queue()
+            for user in self.customers:
+                order = list(self.store_items)
+                self.random.shuffle(order)
+                queue.put((user, order))
+
+            lock_wait_before = lock_wait_sample()
+            threads = [
+                threading.Thread(target=self.worker, args=(queue,), daemon=True)
+                for _ in range(self.workers)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duration = time.perf_counter() - started
+            lock_wait_after = lock_wait_sample()
+
+        lock_wait = lock_wait_after[0] - lock_wait_before[0]
+        lock_waits = lock_wait_after[1] - lock_wait_before[1]
+        items = self.verify()
+        return {
+            'database': connection.vendor,
+            'users': self.users,
+            'workers': self.workers,
+            'duration_s': round(duration, 3),
+            'flows_per_s': round(self.users / duration, 2),
+            'checkouts_per_s': round(self.outcomes[CHECKED_OUT] / duration, 2),
+            'checked_out': self.outcomes[CHECKED_OUT],
+            'sold_out': self.outcomes[SOLD_OUT],
+            'deadlocks': self.outcomes[DEADLOCK],
+            'errors': self.outcomes[ERROR],
+            'checkout_p50_ms': round(percentile(self.latencies, 50), 2) if self.latencies else None,
+            'checkout_p95_ms': round(percentile(self.latencies, 95), 2) if self.latencies else None,
+            'lock_wait_total_s': round(lock_wait, 4),
+            'lock_wait_mean_ms': round(lock_wait / lock_waits * 1000, 2) if lock_waits else None,
+            'items': items,
+            'invariant_ok': all(item['ok'] for item in items),
+        }
+
+    def verify(self):
+        """Checks initial stock == final stock + units sold for each hot item."""
+        sold = dict(
+            OrderItem.objects.filter(store_item__in=self.store_items)
+            .values_list('store_item')
+            .annotate(units=Sum('quantity'))
+        )
+        items = []
+        for store_item in StoreItem.objects.filter(pk__in=[item.pk for item in self.store_items]):
+            units_sold = sold.get(store_item.pk, 0)
+            items.append({
+                'id': store_item.pk,
+                'initial_stock': self.stock,
+                'final_stock': store_item.stock,
+                'units_sold': units_sold,
+                'ok': store_item.stock >= 0 and self.stock == store_item.stock + units_sold,
+            })
+        return items
+
+    def cleanup(self):
+        """Hard-deletes everything `setup` created; orders and carts cascade."""
+        User = get_user_model()
+        User.all_objects.filter(pk__in=[user.pk for user in self.customers]).delete()
+        for model, obj in ((Store, self.store), (User, self.seller), (Category, self.category)):
+            if obj is not None:
+                model.all_objects.filter(pk=obj.pk).delete()
@@ -1,20 +1,92 @@
 import os
+from datetime import datetime, timedelta
 
 from celery import shared_task
-from django.core.mail import send_mail
-from django.db.models import Count, Q
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import get_connection, send_mail, send_mass_mail
+from django.db.models import F, Q
+from django.utils import timezone
 
+from .analytics import rollup_sales_batch
 from .models import Cart, Order, Payment
+from .services import expire_unpaid_orders
 
 
-@shared_task
-def send_unpaid_order_reminders():
-    unpaid_orders = Order.objects.filter(
+REMINDER_CHUNK_SIZE = 200
+
+
+def _id_ranges(queryset, chunk_size):
+    """Yields `(first_id, last_id)` keyset ranges of about `chunk_size` rows.
+
+    The last range is open-ended (`last_id` is None) so rows created while
+    the coordinator runs are still picked up by the final chunk.
+    """
+    ids = queryset.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        first_id = ids.filter(id__gt=last_id).first()
+        if first_id is None:
+            return
+        boundary = list(ids.filter(id__gte=first_id)[chunk_size - 1 : chunk_size])
+        if not boundary:
+            yield first_id, None
+            return
+        last_id = boundary[0]
+        yield first_id, last_id
+
+
+def _in_range(queryset, first_id, last_id):
+    queryset = queryset.filter(id__gte=first_id)
+    if last_id is not None:
+        queryset = queryset.filter(id__lte=last_id)
+    return queryset
+
+
+def _send_batch(messages):
+    if not messages:
+        return 0
+    return send_mass_mail(messages, connection=get_connection())
+
+
+def _unpaid_orders():
+    return Order.objects.filter(
         status=Order.PENDING,
         payment_order__status=Payment.PENDING,
-    ).select_related('customer')
+    )
+
+
+def _idle_carts(since, cutoff):
+    """Carts with items whose last activity fell in `(since, cutoff]` and were not reminded since."""
+    return Cart.objects.filter(
+        Q(reminded_at__isnull=True) | Q(reminded_at__lt=F('last_activity_at')),
+        item_count__gt=0,
+        last_activity_at__gt=since,
+        last_activity_at__lte=cutoff,
+    )
+
+
+@shared_task
+def send_unpaid_order_reminders():
+    chunks = 0
+    for first_id, last_id in _id_ranges(_unpaid_orders(), REMINDER_CHUNK_SIZE):
+        send_unpaid_order_reminders_chunk.delay(first_id, last_id)
+        chunks += 1
+    return f'Dispatched {chunks} unpaid order reminder chunks.'
 
-    for order in unpaid_orders:
+
+@shared_task(ignore_result=True)
+def send_unpaid_order_reminders_chunk(first_id, last_id):
+    unpaid_orders = (
+        _in_range(_unpaid_orders(), first_id, last_id)
+        .distinct()
+        .select_related('customer')
+        .only('id', 'total_price', 'customer__email', 'customer__first_name')
+    )
+
+    from_email = os.getenv('EMAIL_HOST_USER', '')
+    messages = []
+    for order in unpaid_orders.iterator(chunk_size=REMINDER_CHUNK_SIZE):
         user = order.customer
         subject = f'Reminder: Your order #{order.id} is still unpaid'
         message = (
@@ -24,22 +96,49 @@ def send_unpaid_order_reminders():
             f'Please visit your account to complete the payment.\n\n'
             'Thank you for shopping with us!'
         )
-        send_mail(subject, message, os.getenv('EMAIL_HOST_USER', ''), [user.email])
+        messages.append((subject, message, from_email, [user.email]))
+
+    sent = _send_batch(messages)
+    return f'Sent {sent} unpaid order reminders.'
+
 
-    return f'Sent {unpaid_orders.count()} unpaid order reminders.'
+CART_REMINDER_WATERMARK_KEY = 'cart_reminders:cutoff'
 
 
 @shared_task
 def send_cart_reminders():
-    inactive_carts = (
-        Cart.objects.annotate(
-            item_count=Count('cartitem_cart', filter=Q(cartitem_cart__is_deleted=False))
+    cutoff = timezone.now() - timedelta(hours=settings.CART_REMINDER_IDLE_HOURS)
+    since = cache.get(CART_REMINDER_WATERMARK_KEY) or cutoff - timedelta(
+        hours=settings.CART_REMINDER_LOOKBACK_HOURS
+    )
+
+    chunks = 0
+    for first_id, last_id in _id_ranges(_idle_carts(since, cutoff), REMINDER_CHUNK_SIZE):
+        send_cart_reminders_chunk.delay(
+            first_id, last_id, since.isoformat(), cutoff.isoformat()
+        )
+        chunks += 1
+
+    cache.set(CART_REMINDER_WATERMARK_KEY, cutoff, timeout=None)
+    return f'Dispatched {chunks} cart reminder chunks.'
+
+
+@shared_task(ignore_result=True)
+def send_cart_reminders_chunk(first_id, last_id, since, cutoff):
+    carts = (
+        _in_range(
+            _idle_carts(datetime.fromisoformat(since), datetime.fromisoformat(cutoff)),
+            first_id,
+            last_id,
         )
-        .filter(item_count__gt=0)
         .select_related('user')
+        .only('id', 'user__email', 'user__first_name')
     )
 
-    for cart in inactive_carts:
+    from_email = os.getenv('EMAIL_HOST_USER', '')
+    messages = []
+    cart_ids = []
+    for cart in carts.iterator(chunk_size=REMINDER_CHUNK_SIZE):
         user = cart.user
         subject = 'You still have items waiting in your cart '
         message = (
@@ -48,12 +147,15 @@ def send_cart_reminders():
             'Come back and complete your purchase before your favorite items run out!\n\n'
             'Visit your cart now to finish your order.'
         )
-        send_mail(subject, message, os.getenv('EMAIL_HOST_USER', ''), [user.email])
+        messages.append((subject, message, from_email, [user.email]))
+        cart_ids.append(cart.id)
 
-    return f'Sent {inactive_carts.count()} cart reminders.'
+    sent = _send_batch(messages)
+    Cart.objects.filter(id__in=cart_ids).update(reminded_at=timezone.now())
+    return f'Sent {sent} cart reminders.'
 
 
-@shared_task
+@shared_task(ignore_result=True)
 def send_payment_success_email_task(subject, message, recipient_list):
     send_mail(
         subject,
@@ -62,3 +164,21 @@ def send_payment_success_email_task(subject, message, recipient_list):
         recipient_list,
         fail_silently=False,
     )
+
+
+@shared_task
+def rollup_seller_sales(max_batches=20):
+    rolled_up = 0
+    for _ in range(max_batches):
+        processed = rollup_sales_batch()
+        rolled_up += processed
+        if not processed:
+            break
+    return f'Rolled up {rolled_up} payments.'
+
+
+@shared_task
+def expire_unpaid_orders_task():
+    deadline = timezone.now() - timedelta(minutes=settings.UNPAID_ORDER_EXPIRY_MINUTES)
+    expired = expire_unpaid_orders(deadline)
+    return f'Expired {expired} unpaid orders.'
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Address
+from orders.analytics import rollup_sales_batch
+from orders.models import Order, OrderItem, Payment, SellerSalesRollup, StoreItemSalesRollup
+from products.models import Category, Product
+from stores.models import Store, StoreItem
+
+User = get_user_model()
+
+
+class SellerAnalyticsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", password="pass123")
+        self.seller = User.objects.create_user(email="seller@example.com", password="pass123", role="seller")
+        store = Store.objects.create(name="Seller Store", seller=self.seller)
+        category = Category.objects.create(name="Category", description="Desc")
+        self.item1 = StoreItem.objects.create(
+            store=store, product=Product.objects.create(name="Tea", category=category), price=100, stock=50
+        )
+        self.item2 = StoreItem.objects.create(
+            store=store, product=Product.objects.create(name="Cake", category=category), price=40, stock=50
+        )
+        self.address = Address.objects.create(
+            user=self.user, label="Home", address_line_1="Line 1", city="City",
+            state="State", country="Country", postal_code="0000",
+        )
+        self.created_at = datetime(2025, 10, 1, 14, 25, tzinfo=timezone.utc)
+
+    def place_order(self, lines, payment_status=Payment.SUCCESS):
+        order = Order.objects.create(customer=self.user, address=self.address)
+        Order.objects.filter(id=order.id).update(created_at=self.created_at)
+        for store_item, quantity in lines:
+            OrderItem.objects.create(order=order, store_item=store_item, quantity=quantity, price=store_item.price)
+        Payment.objects.create(order=order, amount=0, status=payment_status)
+        return order
+
+    def test_rollup_is_incremental(self):
+        self.place_order([(self.item1, 2), (self.item2, 1)])
+        self.place_order([(self.item1, 1)], payment_status=Payment.PENDING)
+
+        self.assertEqual(rollup_sales_batch(), 1)
+        self.assertEqual(rollup_sales_batch(), 0)
+
+        self.place_order([(self.item1, 1)])
+        self.assertEqual(rollup_sales_batch(), 1)
+
+        hourly = SellerSalesRollup.objects.get(seller=self.seller, period=SellerSalesRollup.HOUR)
+        self.assertEqual(hourly.bucket, datetime(2025, 10, 1, 14, tzinfo=timezone.utc))
+        self.assertEqual(hourly.revenue, Decimal("340.00"))
+        self.assertEqual(hourly.units, 4)
+        self.assertEqual(hourly.order_count, 2)
+        daily_tea = StoreItemSalesRollup.objects.get(store_item=self.item1, period=SellerSalesRollup.DAY)
+        self.assertEqual(daily_tea.units, 3)
+        self.assertEqual(daily_tea.seller, self.seller)
+
+    def test_seller_analytics_endpoint(self):
+        self.place_order([(self.item1, 2), (self.item2, 3)])
+        rollup_sales_batch()
+
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get(
+            reverse("mystore_analytics-list"),
+            {"period": "hour", "date_from": "2025-10-01", "date_to": "2025-10-01", "top": 1},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["totals"]["revenue"], Decimal("320.00"))
+        self.assertEqual(response.data["totals"]["order_count"], 1)
+        self.assertEqual(len(response.data["series"]), 1)
+        self.assertEqual(response.data["top_items"][0]["product_name"], "Tea")
+
+    def test_customer_cannot_view_analytics(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse("mystore_analytics-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,10 +1,13 @@
+from unittest.mock import patch
+
+from django.db import connection
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from products.models import Product, Category
 from stores.models import Store, StoreItem
-from orders.models import Cart
+from orders.models import Cart, CartItem
 
 User = get_user_model()
 
@@ -87,4 +90,66 @@ class CartTests(APITestCase):
         response = self.client.patch(update_url, {"cart_item_id": cart_item_id, "quantity": 0}, format="json")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data["items"]), 0)
\ No newline at end of file
+        self.assertEqual(len(response.data["items"]), 0)
+
+    def test_cart_endpoints_track_item_count_and_activity(self):
+        add_url = reverse("mycart-add-to-cart")
+        self.client.post(add_url, {"store_item_id": self.store_item.id, "quantity": 1}, format="json")
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual(cart.item_count, 1)
+        first_activity = cart.last_activity_at
+        self.assertIsNotNone(first_activity)
+
+        self.client.delete(reverse("mycart-clear-cart"))
+        cart.refresh_from_db()
+        self.assertEqual(cart.item_count, 0)
+        self.assertGreaterEqual(cart.last_activity_at, first_activity)
+
+    def add_three_times(self):
+        url = reverse("mycart-add-to-cart")
+        self.client.post(url, {"store_item_id": self.store_item.id, "quantity": 2}, format="json")
+        self.client.post(url, {"store_item_id": self.store_item.id, "quantity": 2}, format="json")
+        return self.client.post(url, {"store_item_id": self.store_item.id, "quantity": 2}, format="json")
+
+    def test_repeated_adds_upsert_one_line(self):
+        response = self.add_three_times()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["message"], "You already have 4 in your cart. Only 5 total available.")
+        self.assertEqual(list(CartItem.objects.values_list("quantity", flat=True)), [4])
+
+    def test_repeated_adds_without_upsert_support(self):
+        with patch.object(connection.features, "supports_update_conflicts_with_target", False):
+            response = self.add_three_times()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(CartItem.objects.values_list("quantity", flat=True)), [4])
+
+    def test_cart_list_answers_conditional_requests(self):
+        url = reverse("mycart-list")
+        response = self.client.get(url)
+        etag = response.headers["ETag"]
+        self.assertIn("private", response.headers["Cache-Control"])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(reverse("mycart-add-to-cart"), {"store_item_id": self.store_item.id}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["items"]), 1)
+        etag = response.headers["ETag"]
+
+        self.store_item.price = 90
+        self.store_item.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deleted_cart_is_replaced_instead_of_served_from_cache(self):
+        self.client.get(reverse("mycart-list"))
+        Cart.objects.get(user=self.user).hard_delete()
+
+        response = self.client.get(reverse("mycart-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], Cart.objects.get(user=self.user).id)
@@ -0,0 +1,111 @@
+import io
+import json
+import warnings
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Address
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from stores.models import Store, StoreItem
+
+User = get_user_model()
+
+
+class OrderExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", password="pass123")
+        self.seller = User.objects.create_user(email="seller@example.com", password="pass123", role="seller")
+        self.other_seller = User.objects.create_user(email="other@example.com", password="pass123", role="seller")
+        self.admin = User.objects.create_user(email="admin@example.com", password="pass123", is_staff=True)
+        category = Category.objects.create(name="Category", description="Desc")
+        product = Product.objects.create(name="Product1", description="Desc", category=category)
+        self.item = StoreItem.objects.create(
+            store=Store.objects.create(name="Seller Store", seller=self.seller),
+            product=product, price=100, stock=5,
+        )
+        other_item = StoreItem.objects.create(
+            store=Store.objects.create(name="Other Store", seller=self.other_seller),
+            product=product, price=50, stock=5,
+        )
+        address = Address.objects.create(
+            user=self.user, label="Home", address_line_1="Line 1", city="City",
+            state="State", country="Country", postal_code="0000",
+        )
+        self.order = Order.objects.create(customer=self.user, address=address, total_price=250)
+        OrderItem.objects.create(order=self.order, store_item=self.item, quantity=2, price=100)
+        OrderItem.objects.create(order=self.order, store_item=other_item, quantity=1, price=50)
+        self.url = reverse("orders-export")
+
+    def read_ndjson(self, response):
+        body = b"".join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_admin_exports_all_order_lines(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = self.read_ndjson(response)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["order_id"], self.order.id)
+        self.assertEqual(rows[0]["order_status"], "Pending")
+        self.assertEqual(rows[0]["customer_email"], "user@example.com")
+        self.assertEqual(rows[0]["order_total_price"], "250.00")
+
+    def test_seller_only_exports_own_items(self):
+        self.client.force_authenticate(user=self.seller)
+        response = self.client.get(self.url, {"file_format": "csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Seller Store", lines[1])
+        self.assertEqual(lines[1].split(",")[-1], "200.00")
+
+    def test_seller_exports_leave_out_whole_order_values(self):
+        self.client.force_authenticate(user=self.seller)
+        rows = self.read_ndjson(self.client.get(self.url))
+        lines = b"".join(self.client.get(self.url, {"file_format": "csv"}).streaming_content).decode().splitlines()
+
+        self.assertEqual(len(rows), 1)
+        for column in ("customer_email", "order_total_price", "order_total_discount"):
+            self.assertNotIn(column, rows[0])
+            self.assertNotIn(column, lines[0])
+        self.assertNotIn("user@example.com", "\n".join(lines))
+        self.assertNotIn("250.00", "\n".join(lines))
+        self.assertEqual(rows[0]["line_total"], "200.00")
+
+    def test_export_applies_order_filter(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(self.url, {"status": Order.DELIVERED})
+
+        self.assertEqual(self.read_ndjson(response), [])
+
+    def test_date_filters_include_the_named_day(self):
+        today = timezone.localdate().isoformat()
+        out = io.StringIO()
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            call_command("export_orders", date_from=today, date_to=today, stdout=out)
+
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_customer_cannot_export(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_orders_command(self):
+        out = io.StringIO()
+        call_command("export_orders", seller=self.other_seller.email, stdout=out)
+
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row["store_name"] for row in rows], ["Other Store"])
+        self.assertNotIn("order_total_price", rows[0])
@@ -1,3 +1,5 @@
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -6,6 +8,7 @@ from products.models import Product, Category
 from stores.models import Store, StoreItem
 from orders.models import Order, CartItem
 from accounts.models import Address
+from orders.stress import CheckoutStress
 
 User = get_user_model()
 
@@ -48,6 +51,16 @@ class OrderTests(APITestCase):
         self.assertEqual(order.orderitem_order.count(), 1)
         self.assertEqual(order.total_price, 200)  # 2 x 100
 
+    def test_checkout_changes_the_store_item_etag(self):
+        url = reverse("mystore_items-detail", args=[self.store_item.id])
+        etag = self.client.get(url).headers["ETag"]
+
+        self.client.post(reverse("orders-checkout"), {"address_id": self.address.id}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["stock"], 3)
+
     def test_checkout_with_empty_cart_fails(self):
         CartItem.objects.filter(cart__user=self.user).delete()
 
@@ -81,3 +94,23 @@ class OrderTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("detail", response.data)
         self.assertIn("not enough stock", response.data["detail"].lower())
+
+
+class CheckoutStressTests(TransactionTestCase):
+    def test_stock_invariant_holds_when_items_sell_out(self):
+        stress = CheckoutStress(users=6, workers=1, stock=4, hot_items=2, seed=1)
+        report = stress.run()
+
+        self.assertTrue(report["invariant_ok"])
+        self.assertEqual(report["checked_out"], 4)
+        self.assertEqual(report["sold_out"], 2)
+        self.assertEqual(report["deadlocks"] + report["errors"], 0)
+        self.assertEqual([item["units_sold"] for item in report["items"]], [4, 4])
+
+        stress.cleanup()
+        self.assertFalse(StoreItem.all_objects.filter(pk__in=[item["id"] for item in report["items"]]).exists())
+        self.assertFalse(Order.all_objects.exists())
+
+    def test_command_requires_postgres(self):
+        with self.assertRaisesMessage(CommandError, "needs PostgreSQL"):
+            call_command("stress_checkout", users=1)
@@ -0,0 +1,99 @@
+from unittest.mock import Mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Address
+from orders.admin import make_cancelled, mark_payments_failed
+from orders.models import Order, OrderItem, Payment
+from orders.services import InsufficientStock, cancel_orders, change_order_status
+from products.models import Category, Product
+from stores.models import Store, StoreItem
+
+User = get_user_model()
+
+
+class OrderStatusServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", password="pass123")
+        seller = User.objects.create_user(email="seller@example.com", password="pass123", role="seller")
+        store = Store.objects.create(name="Seller Store", seller=seller)
+        category = Category.objects.create(name="Category", description="Desc")
+        product = Product.objects.create(name="Product1", description="Desc", category=category)
+        self.item1 = StoreItem.objects.create(store=store, product=product, price=100, stock=1)
+        self.item2 = StoreItem.objects.create(store=store, product=product, price=50, stock=0)
+        self.address = Address.objects.create(
+            user=self.user, label="Home", address_line_1="Line 1", city="City",
+            state="State", country="Country", postal_code="0000",
+        )
+        self.order1 = self.place_order([(self.item1, 2), (self.item2, 1)])
+        self.order2 = self.place_order([(self.item1, 3)])
+
+    def place_order(self, lines):
+        order = Order.objects.create(customer=self.user, address=self.address)
+        for store_item, quantity in lines:
+            OrderItem.objects.create(order=order, store_item=store_item, quantity=quantity, price=store_item.price)
+        Payment.objects.create(order=order, amount=100)
+        return order
+
+    def test_cancel_restores_aggregated_stock(self):
+        with self.assertNumQueries(8):
+            cancelled = cancel_orders(Order.objects.all())
+
+        self.assertCountEqual(cancelled, [self.order1.id, self.order2.id])
+        self.item1.refresh_from_db()
+        self.item2.refresh_from_db()
+        self.assertEqual(self.item1.stock, 6)
+        self.assertEqual(self.item2.stock, 1)
+        self.assertFalse(Payment.objects.filter(status=Payment.PENDING).exists())
+
+    def test_cancel_is_idempotent(self):
+        cancel_orders([self.order1.id])
+        self.assertEqual(cancel_orders([self.order1.id]), [])
+
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.stock, 3)
+
+    def test_reactivating_cancelled_order_reserves_stock(self):
+        cancel_orders([self.order1.id])
+
+        change_order_status([self.order1.id], Order.PROCESSING)
+
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.stock, 1)
+        self.order1.refresh_from_db()
+        self.assertEqual(self.order1.status, Order.PROCESSING)
+
+    def test_reactivating_without_stock_fails(self):
+        cancel_orders([self.order2.id])
+        StoreItem.objects.filter(id=self.item1.id).update(stock=1)
+
+        with self.assertRaises(InsufficientStock):
+            change_order_status([self.order2.id], Order.PENDING)
+
+        self.order2.refresh_from_db()
+        self.assertEqual(self.order2.status, Order.CANCELLED)
+
+    def test_admin_actions_use_service(self):
+        modeladmin = Mock()
+        make_cancelled(modeladmin, Mock(), Order.objects.filter(id=self.order2.id))
+        mark_payments_failed(modeladmin, Mock(), Payment.objects.filter(order=self.order1))
+
+        self.assertEqual(Order.objects.filter(status=Order.CANCELLED).count(), 2)
+        self.item1.refresh_from_db()
+        self.assertEqual(self.item1.stock, 6)
+
+    def test_failing_payments_locks_orders_first(self):
+        payments = Payment.objects.filter(order=self.order1)
+        updated_at = payments.get().updated_at
+        with CaptureQueriesContext(connection) as queries:
+            mark_payments_failed(Mock(), Mock(), payments)
+
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertIn('"orders_order"', updates[-2])
+        self.assertIn('"orders_payment"', updates[-1])
+        payment = payments.get()
+        self.assertEqual(payment.status, Payment.FAILED)
+        self.assertGreater(payment.updated_at, updated_at)
@@ -8,6 +8,8 @@ from orders.models import Order, Payment
 from accounts.models import Address
 from unittest.mock import patch
 
+from orders.services import cancel_orders
+
 User = get_user_model()
 
 
@@ -114,3 +116,22 @@ class PaymentTests(APITestCase):
 
         payment.refresh_from_db()
         self.assertEqual(payment.status, Payment.SUCCESS) 
+
+    @patch("orders.views.requests.post")
+    def test_verification_after_expiry_leaves_the_order_cancelled(self, mock_post):
+        payment = Payment.objects.create(
+            order=self.order,
+            amount=self.order.total_price,
+            reference_id="TESTAUTH",
+        )
+        cancel_orders([self.order.id], from_statuses=[Order.PENDING])
+
+        verify_url = reverse("payments-verify", kwargs={"pk": payment.id})
+        response = self.client.get(verify_url, {"Status": "OK", "Authority": "TESTAUTH"})
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        mock_post.assert_not_called()
+        self.order.refresh_from_db()
+        payment.refresh_from_db()
+        self.assertEqual(self.order.status, Order.CANCELLED)
+        self.assertEqual(payment.status, Payment.FAILED)
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import Address
+from core.testing import QueryBudgetMixin
+from orders.models import Cart, CartItem, Order, OrderItem
+from products.models import Category, Product, ProductImage
+from stores.models import Store, StoreItem
+
+User = get_user_model()
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="user@example.com", password="pass123")
+        self.seller = User.objects.create_user(email="seller@example.com", password="pass123", role="seller")
+        self.store = Store.objects.create(name="Seller Store", seller=self.seller)
+        self.address = Address.objects.create(
+            user=self.user,
+            city="City",
+            address_line_1="Line 1",
+            state="State",
+            country="Country",
+            postal_code="0000",
+            label="Home",
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+        # budgets are for a warm cart id cache, as in steady state
+        self.client.get(reverse("mycart-list"))
+
+    def make_store_item(self):
+        number = StoreItem.all_objects.count()
+        category = Category.objects.create(name=f"Category {number}", description="Desc")
+        product = Product.objects.create(name=f"Product {number}", description="Desc", category=category)
+        ProductImage.objects.create(product=product, image="product/a.png")
+        ProductImage.objects.create(product=product, image="product/b.png")
+        return StoreItem.objects.create(store=self.store, product=product, price=100, stock=10)
+
+    def add_cart_items(self, count=3):
+        for _ in range(count):
+            CartItem.objects.create(cart=self.cart, store_item=self.make_store_item(), quantity=1)
+
+    def add_orders(self, count=3):
+        for _ in range(count):
+            order = Order.objects.create(customer=self.user, address=self.address, total_price=100)
+            OrderItem.objects.create(order=order, store_item=self.make_store_item(), quantity=1, price=100)
+            OrderItem.objects.create(order=order, store_item=self.make_store_item(), quantity=1, price=100)
+
+    def test_cart_list_is_constant_in_items(self):
+        self.add_cart_items(1)
+        url = reverse("mycart-list")
+        self.assertConstantQueries(lambda: self.client.get(url), self.add_cart_items)
+
+        with self.assertQueryBudget(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["items"]), 4)
+        self.assertEqual(len(response.data["items"][0]["product_image"]), 2)
+
+    def test_add_to_cart_is_constant_in_items(self):
+        url = reverse("mycart-add-to-cart")
+        first, second = self.make_store_item(), self.make_store_item()
+
+        with self.assertQueryBudget(8):
+            self.client.post(url, {"store_item_id": first.id}, format="json")
+        self.add_cart_items()
+        with self.assertQueryBudget(8):
+            response = self.client.post(url, {"store_item_id": second.id}, format="json")
+        self.assertEqual(len(response.data["items"]), 5)
+
+    def test_my_orders_is_constant_in_orders(self):
+        self.add_orders(1)
+        url = reverse("orders-my-orders")
+        self.assertConstantQueries(lambda: self.client.get(url), self.add_orders)
+
+        with self.assertQueryBudget(5):
+            response = self.client.get(url)
+        results = response.data["results"] if "results" in response.data else response.data
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]["user_address"]["city"], "City")
+
+    def test_budget_failure_reports_repeated_shapes(self):
+        self.add_cart_items()
+        with self.assertRaises(AssertionError) as raised:
+            with self.assertQueryBudget(10):
+                for item in CartItem.objects.all():
+                    item.store_item.product.name
+        report = str(raised.exception)
+        self.assertIn("possible N+1, ran 3x", report)
+        self.assertIn('"stores_storeitem"."id" = ?', report)
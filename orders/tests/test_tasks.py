@@ -0,0 +1,139 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from CustomyShop.celery import app
+from accounts.models import Address
+from orders.models import Cart, CartItem, Order, OrderItem, Payment
+from orders.services import expire_unpaid_orders
+from orders.tasks import (
+    expire_unpaid_orders_task,
+    send_cart_reminders,
+    send_unpaid_order_reminders,
+)
+from products.models import Category, Product
+from stores.models import Store, StoreItem
+
+User = get_user_model()
+
+
+class ExpireUnpaidOrdersTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="user@example.com", password="pass123")
+        seller = User.objects.create_user(email="seller@example.com", password="pass123", role="seller")
+        store = Store.objects.create(name="Seller Store", seller=seller)
+        category = Category.objects.create(name="Category", description="Desc")
+        product = Product.objects.create(name="Product1", description="Desc", category=category)
+        self.store_item = StoreItem.objects.create(store=store, product=product, price=100, stock=0)
+        self.address = Address.objects.create(
+            user=self.user, label="Home", address_line_1="Line 1", city="City",
+            state="State", country="Country", postal_code="0000",
+        )
+
+    def place_order(self, quantity, age, payment_status=Payment.PENDING, status=Order.PENDING):
+        order = Order.objects.create(customer=self.user, address=self.address, status=status)
+        Order.objects.filter(id=order.id).update(created_at=timezone.now() - age)
+        OrderItem.objects.create(order=order, store_item=self.store_item, quantity=quantity, price=100)
+        Payment.objects.create(order=order, amount=100, status=payment_status)
+        return order
+
+    def test_expires_old_unpaid_orders_in_batches(self):
+        stale = [self.place_order(1, timedelta(hours=3)) for _ in range(5)]
+        fresh = self.place_order(2, timedelta(minutes=5))
+        paid = self.place_order(4, timedelta(hours=3), payment_status=Payment.SUCCESS)
+
+        expired = expire_unpaid_orders(timezone.now() - timedelta(hours=1), batch_size=2)
+
+        self.assertEqual(expired, 5)
+        self.assertEqual(
+            set(Order.objects.filter(status=Order.CANCELLED).values_list("id", flat=True)),
+            {order.id for order in stale},
+        )
+        self.assertEqual(Order.objects.get(id=fresh.id).status, Order.PENDING)
+        self.assertEqual(Order.objects.get(id=paid.id).status, Order.PENDING)
+        self.store_item.refresh_from_db()
+        self.assertEqual(self.store_item.stock, 5)
+        self.assertEqual(Payment.objects.filter(status=Payment.FAILED).count(), 5)
+
+    @override_settings(UNPAID_ORDER_EXPIRY_MINUTES=30)
+    def test_expiry_task_uses_configured_deadline(self):
+        self.place_order(1, timedelta(minutes=45))
+        self.place_order(1, timedelta(minutes=10))
+
+        self.assertEqual(expire_unpaid_orders_task(), "Expired 1 unpaid orders.")
+
+
+class ReminderTasksTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seller = User.objects.create_user(email="seller@example.com", password="pass123", role="seller")
+        store = Store.objects.create(name="Seller Store", seller=seller)
+        category = Category.objects.create(name="Category", description="Desc")
+        product = Product.objects.create(name="Product1", description="Desc", category=category)
+        self.store_item = StoreItem.objects.create(store=store, product=product, price=100, stock=10)
+        self.users = [
+            User.objects.create_user(email=f"user{i}@example.com", password="pass123") for i in range(5)
+        ]
+
+    @patch("orders.tasks.REMINDER_CHUNK_SIZE", 2)
+    def test_unpaid_order_reminders_fan_out_in_chunks(self):
+        for user in self.users:
+            address = Address.objects.create(
+                user=user, label="Home", address_line_1="Line 1", city="City",
+                state="State", country="Country", postal_code="0000",
+            )
+            order = Order.objects.create(customer=user, address=address, total_price=100)
+            Payment.objects.create(order=order, amount=100)
+        Order.objects.filter(customer=self.users[0]).update(status=Order.PROCESSING)
+
+        with patch("orders.tasks.get_connection", wraps=mail.get_connection) as get_connection:
+            result = send_unpaid_order_reminders()
+
+        self.assertEqual(result, "Dispatched 2 unpaid order reminder chunks.")
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertNotIn(["user0@example.com"], [message.to for message in mail.outbox])
+
+    def make_cart(self, user, idle, items=1, reminded_at=None):
+        last_activity_at = timezone.now() - idle
+        cart = Cart.objects.create(
+            user=user, item_count=items, last_activity_at=last_activity_at, reminded_at=reminded_at
+        )
+        for _ in range(items):
+            CartItem.objects.create(cart=cart, store_item=self.store_item, quantity=1)
+        return cart
+
+    @override_settings(CART_REMINDER_IDLE_HOURS=24, CART_REMINDER_LOOKBACK_HOURS=48)
+    def test_cart_reminders_only_target_newly_idle_carts(self):
+        self.make_cart(self.users[0], timedelta(hours=30))
+        self.make_cart(self.users[1], timedelta(hours=2))
+        self.make_cart(self.users[2], timedelta(hours=30), items=0)
+        self.make_cart(self.users[3], timedelta(hours=100))
+        self.make_cart(self.users[4], timedelta(hours=30), reminded_at=timezone.now())
+
+        self.assertEqual(send_cart_reminders(), "Dispatched 1 cart reminder chunks.")
+        self.assertEqual([message.to for message in mail.outbox], [["user0@example.com"]])
+        self.assertIsNotNone(Cart.objects.get(user=self.users[0]).reminded_at)
+
+        mail.outbox = []
+        self.assertEqual(send_cart_reminders(), "Dispatched 0 cart reminder chunks.")
+        self.assertEqual(mail.outbox, [])
+
+
+class TaskRoutingTests(TestCase):
+    def queue_of(self, name):
+        return app.amqp.router.route({}, name, (), {})["queue"].name
+
+    def test_latency_sensitive_tasks_use_realtime_queue(self):
+        self.assertEqual(self.queue_of("accounts.tasks.send_otp_email_task"), "realtime")
+        self.assertEqual(self.queue_of("orders.tasks.send_payment_success_email_task"), "realtime")
+
+    def test_bulk_tasks_use_batch_queue(self):
+        self.assertEqual(self.queue_of("orders.tasks.send_cart_reminders_chunk"), "batch")
+        self.assertEqual(self.queue_of("orders.tasks.rollup_seller_sales"), "batch")
+        self.assertEqual(self.queue_of("products.tasks.import_catalog_task"), "batch")
@@ -5,6 +5,7 @@ router = DefaultRouter()
 router.register('mycart', views.CartApiView, basename='mycart')
 router.register('orders', views.OrderViewSet, basename='orders')
 router.register('payments', views.PaymentViewSet, basename='payments')
+router.register('mystore-analytics', views.SellerAnalyticsViewSet, basename='mystore_analytics')
 
 
 urlpatterns = router.urls
\ No newline at end of file
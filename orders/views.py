@@ -1,14 +1,28 @@
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from time import perf_counter
+
 import requests
+from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import OpenApiExample, OpenApiResponse, extend_schema
 from rest_framework import filters, mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from core import tracing
+from core.cache import get_or_compute
+from core.conditional import not_modified, queryset_validators, set_validators
+from core.metrics import CHECKOUT_LOCK_WAIT
 from stores.models import StoreItem
 
+from .analytics import get_seller_analytics
+from .exports import CSV, EXPORT_FORMATS, NDJSON, get_export_rows, render_export
 from .filters import OrderFilter
 from .models import Cart, CartItem, Order, OrderItem, Payment
 from .serializers import (
@@ -20,11 +34,38 @@ from .serializers import (
     OrderSerializer,
     PaymentStartSerializer,
     PaymentVerifySerializer,
+    SellerAnalyticsQuerySerializer,
     UpdateCartQuantitySerializer,
 )
+from .services import add_cart_item, touch_cart
 from .signals import payment_verified
 
 
+# everything the serializers read per item, so responses cost the same
+# number of queries however many items there are
+CART_ITEMS_PREFETCH = Prefetch(
+    'cartitem_cart',
+    queryset=CartItem.objects.select_related(
+        'store_item__product__category'
+    ).prefetch_related('store_item__product__image_product'),
+)
+
+# touch_cart stamps item_count changes into last_activity_at and updated_at;
+# the item and product stamps cover price and name changes shown in the cart
+CART_VERSION_FIELDS = (
+    'updated_at',
+    'last_activity_at',
+    'cartitem_cart__updated_at',
+    'cartitem_cart__store_item__updated_at',
+    'cartitem_cart__store_item__product__updated_at',
+)
+
+ORDER_ITEMS_PREFETCH = Prefetch(
+    'orderitem_order',
+    queryset=OrderItem.objects.select_related('store_item__product'),
+)
+
+
 class CartApiView(viewsets.GenericViewSet):
     serializer_class = CartSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -33,24 +74,32 @@ class CartApiView(viewsets.GenericViewSet):
         return Cart.objects.filter(user=self.request.user)
 
     def get_object(self):
-        user_id = self.request.user.id
-        cache_key = f'cart:{user_id}'
-
-        cached_cart = cache.get(cache_key)
-        if cached_cart:
-            try:
-                return Cart.objects.only('id', 'user').get(id=cached_cart['id'])
-            except Cart.DoesNotExist:
-                cache.delete(cache_key)
+        cache_key = f'cart:{self.request.user.id}'
+        try:
+            return Cart.objects.only('id', 'user').get(id=self.get_cart_id(cache_key))
+        except Cart.DoesNotExist:
+            # the cached id points at a deleted cart
+            cache.delete(cache_key)
+            return Cart.objects.only('id', 'user').get(id=self.get_cart_id(cache_key))
+
+    def get_cart_id(self, cache_key):
+        # a cart id never goes stale in place, so no stale window is needed
+        return get_or_compute(
+            cache_key,
+            lambda: Cart.objects.get_or_create(user=self.request.user)[0].id,
+            timeout=300,
+            stale=0,
+        )
 
-        cart, _ = Cart.objects.get_or_create(user=self.request.user)
-        cache.set(cache_key, {'id': cart.id}, timeout=300)
-        return cart
+    def serialize_cart(self, cart):
+        cart = Cart.objects.prefetch_related(CART_ITEMS_PREFETCH).get(pk=cart.pk)
+        return CartSerializer(cart).data
 
     def list(self, request):
         cart = self.get_object()
-        serializer = self.get_serializer(cart)
-        return Response(serializer.data)
+        etag, last_modified = queryset_validators(Cart.objects.filter(pk=cart.pk), CART_VERSION_FIELDS)
+        response = not_modified(request, etag, last_modified) or Response(self.serialize_cart(cart))
+        return set_validators(response, etag, last_modified, {'private': True, 'no_cache': True})
 
     def retrieve(self, request, pk=None):
         cart = self.get_object()
@@ -131,27 +180,18 @@ class CartApiView(viewsets.GenericViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart, store_item=store_item
-        )
-
-        if cart_item.quantity + quantity > store_item.stock:
+        if add_cart_item(cart, store_item, quantity) is None:
+            in_cart = cart.cartitem_cart.get(store_item=store_item).quantity
             return Response(
                 {
-                    'message': f'You already have {cart_item.quantity} in your cart. '
+                    'message': f'You already have {in_cart} in your cart. '
                     f'Only {store_item.stock} total available.'
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if created:
-            cart_item.quantity = quantity
-        else:
-            cart_item.quantity += quantity
-
-        cart_item.save()
-        cache.delete(f'cart:{request.user.id}')
-        return Response(CartSerializer(cart).data, status=status.HTTP_201_CREATED)
+        touch_cart(cart)
+        return Response(self.serialize_cart(cart), status=status.HTTP_201_CREATED)
 
     @extend_schema(
         request=UpdateCartQuantitySerializer,
@@ -217,9 +257,10 @@ class CartApiView(viewsets.GenericViewSet):
         else:
             cart_item.quantity = quantity
             cart_item.save()
-            cache.delete(f'cart:{request.user.id}')
 
-        return Response(CartSerializer(cart).data)
+        touch_cart(cart)
+
+        return Response(self.serialize_cart(cart))
 
     @action(detail=True, methods=['delete'])
     def remove_item(self, request, pk=None):
@@ -232,14 +273,14 @@ class CartApiView(viewsets.GenericViewSet):
             )
 
         cart_item.delete()
-        cache.delete(f'cart:{request.user.id}')
-        return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        touch_cart(cart)
+        return Response(self.serialize_cart(cart), status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['delete'])
     def clear_cart(self, request):
         cart = self.get_object()
         cart.cartitem_cart.all().delete()
-        cache.delete(f'cart:{request.user.id}')
+        touch_cart(cart)
         return Response({'message': 'Cart cleared.'}, status=status.HTTP_204_NO_CONTENT)
 
     @extend_schema(
@@ -282,9 +323,9 @@ class CartApiView(viewsets.GenericViewSet):
         cart = self.get_object()
         cart.total_discount = serializer.validated_data['discount_value']
         cart.save(update_fields=['total_discount'])
-        cache.delete(f'cart:{request.user.id}')
+        touch_cart(cart)
 
-        return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        return Response(self.serialize_cart(cart), status=status.HTTP_200_OK)
 
 
 class OrderViewSet(viewsets.GenericViewSet):
@@ -305,8 +346,10 @@ class OrderViewSet(viewsets.GenericViewSet):
     ordering = ['-created_at']
 
     def get_queryset(self):
-        return Order.objects.filter(customer=self.request.user).prefetch_related(
-            'orderitem_order', 'payment_order'
+        return (
+            Order.objects.filter(customer=self.request.user)
+            .select_related('address')
+            .prefetch_related(ORDER_ITEMS_PREFETCH, 'payment_order')
         )
 
     def list(self, request, *args, **kwargs):
@@ -321,7 +364,9 @@ class OrderViewSet(viewsets.GenericViewSet):
         serializer = CheckoutSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
 
-        cart = Cart.objects.select_for_update().filter(user=request.user).first()
+        lock_started = perf_counter()
+        with tracing.span('checkout.lock_cart'):
+            cart = Cart.objects.select_for_update().filter(user=request.user).first()
         if not cart or not cart.cartitem_cart.exists():
             return Response(
                 {'detail': 'Cart is empty.'}, status=status.HTTP_400_BAD_REQUEST
@@ -333,9 +378,11 @@ class OrderViewSet(viewsets.GenericViewSet):
                 {'detail': 'Address is required.'}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        cart_items = list(
-            cart.cartitem_cart.select_for_update().select_related('store_item__product')
-        )
+        with tracing.span('checkout.lock_items'):
+            cart_items = list(
+                cart.cartitem_cart.select_for_update().select_related('store_item__product')
+            )
+        CHECKOUT_LOCK_WAIT.observe(perf_counter() - lock_started)
 
         subtotal = 0
         for item in cart_items:
@@ -381,7 +428,7 @@ class OrderViewSet(viewsets.GenericViewSet):
             )
 
             store_item.stock -= item.quantity
-            store_item.save(update_fields=['stock'])
+            store_item.save(update_fields=['stock', 'updated_at'])
 
         payment = Payment.objects.create(
             order=order, amount=order.total_price, fee=0, status=Payment.PENDING
@@ -390,8 +437,9 @@ class OrderViewSet(viewsets.GenericViewSet):
         cart.cartitem_cart.all().delete()
         cart.total_discount = 0
         cart.save(update_fields=['total_discount'])
-        cache.delete(f'cart:{request.user.id}')
+        touch_cart(cart)
         cache.delete(f'orders:{request.user.id}')
+        prefetch_related_objects([order], ORDER_ITEMS_PREFETCH)
 
         return Response(
             {
@@ -420,6 +468,73 @@ class OrderViewSet(viewsets.GenericViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        user = request.user
+        if user.is_staff:
+            orders, seller = Order.objects.all(), None
+        elif user.role == 'seller':
+            orders = Order.objects.filter(orderitem_order__store_item__store__seller=user)
+            seller = user
+        else:
+            return Response(
+                {'detail': 'Only sellers and admins can export orders.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        export_format = request.query_params.get('file_format', NDJSON)
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'detail': f'file_format must be one of: {", ".join(EXPORT_FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        order_filter = OrderFilter(request.query_params, queryset=orders, request=request)
+        if not order_filter.is_valid():
+            return Response(order_filter.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = get_export_rows(order_filter.qs, seller=seller)
+        response = StreamingHttpResponse(
+            render_export(rows, export_format, seller=seller),
+            content_type='text/csv' if export_format == CSV else 'application/x-ndjson',
+        )
+        filename = f'orders-{timezone.now():%Y%m%d%H%M%S}.{export_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class SellerAnalyticsViewSet(viewsets.GenericViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SellerAnalyticsQuerySerializer
+
+    def list(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        user = request.user
+        if user.is_staff and params.get('seller_id'):
+            seller = get_user_model().objects.filter(id=params['seller_id']).first()
+            if not seller:
+                return Response(
+                    {'detail': 'Seller not found.'}, status=status.HTTP_404_NOT_FOUND
+                )
+        elif user.role == 'seller':
+            seller = user
+        else:
+            return Response(
+                {'detail': 'Only sellers can view sales analytics.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        start = datetime.combine(params['date_from'], time.min, tzinfo=dt_timezone.utc)
+        end = datetime.combine(
+            params['date_to'] + timedelta(days=1), time.min, tzinfo=dt_timezone.utc
+        )
+        return Response(
+            get_seller_analytics(seller, params['period'], start, end, top=params['top'])
+        )
+
 
 TEST_MERCHANT_ID = '00000000-0000-0000-0000-000000000000'
 
@@ -636,7 +751,7 @@ class PaymentViewSet(viewsets.GenericViewSet):
             ),
             409: OpenApiResponse(
                 response=PaymentVerifySerializer,
-                description='Payment already verified.',
+                description='Payment already verified, or its order was cancelled.',
                 examples=[
                     OpenApiExample(
                         'Already verified',
@@ -644,7 +759,11 @@ class PaymentViewSet(viewsets.GenericViewSet):
                             'detail': 'Payment already verified.',
                             'ref_id': '123456789012345',
                         },
-                    )
+                    ),
+                    OpenApiExample(
+                        'Order cancelled',
+                        value={'detail': 'Order was cancelled.'},
+                    ),
                 ],
             ),
             502: OpenApiResponse(
@@ -664,13 +783,11 @@ class PaymentViewSet(viewsets.GenericViewSet):
     @action(detail=True, methods=['get'])
     @transaction.atomic
     def verify(self, request, pk=None):
-        payment = (
-            Payment.objects.select_for_update()
-            .filter(pk=pk)
-            .select_related('order')
-            .first()
-        )
-        if not payment:
+        # order before payment, the same order cancel_orders locks them in
+        order_id = Payment.objects.filter(pk=pk).values_list('order_id', flat=True).first()
+        order = Order.objects.select_for_update().filter(pk=order_id).first()
+        payment = Payment.objects.select_for_update().filter(pk=pk, order_id=order_id).first()
+        if not payment or not order:
             serializer = PaymentVerifySerializer({'detail': 'Payment not found.'})
             return Response(serializer.data, status=status.HTTP_404_NOT_FOUND)
 
@@ -683,6 +800,11 @@ class PaymentViewSet(viewsets.GenericViewSet):
             )
             return Response(serializer.data, status=status.HTTP_409_CONFLICT)
 
+        if order.status == Order.CANCELLED:
+            # unverified payments are refunded by the gateway; its stock is already back
+            serializer = PaymentVerifySerializer({'detail': 'Order was cancelled.'})
+            return Response(serializer.data, status=status.HTTP_409_CONFLICT)
+
         if not payment.reference_id:
             serializer = PaymentVerifySerializer({'detail': 'Payment not started.'})
             return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
@@ -717,8 +839,7 @@ class PaymentViewSet(viewsets.GenericViewSet):
             payment.transaction_id = response['data']['ref_id']
             payment.save(update_fields=['status', 'transaction_id'])
 
-            order = payment.order
-            if order.status not in [Order.CANCELLED, Order.DELIVERED]:
+            if order.status == Order.PENDING:
                 order.status = Order.PROCESSING
                 order.save(update_fields=['status'])
 
@@ -1,6 +1,36 @@
-from django.contrib import admin
+import uuid
 
+from django import forms
+from django.contrib import admin, messages
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+
+from accounts.admin_utils import is_seller, is_superadmin
+from stores.models import Store
+
+from .cache import bump_catalog_version
 from .models import Category, Comment, Product, ProductImage, Rating
+from .services import IMPORT_FORMATS, detect_import_format
+from .tasks import import_catalog_task
+
+
+class CatalogImportForm(forms.Form):
+    store = forms.ModelChoiceField(queryset=Store.objects.none())
+    file = forms.FileField(help_text='CSV or NDJSON, one product per row.')
+    file_format = forms.ChoiceField(
+        choices=[('', 'Detect from extension')] + IMPORT_FORMATS, required=False
+    )
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if is_superadmin(user):
+            self.fields['store'].queryset = Store.objects.all()
+        elif is_seller(user):
+            self.fields['store'].queryset = Store.objects.filter(seller=user)
 
 
 class ProductImageInline(admin.TabularInline):
@@ -13,12 +43,16 @@ class ProductImageInline(admin.TabularInline):
 
 @admin.action(description='Enable selected products')
 def enable_products(modeladmin, request, queryset):
-    queryset.update(is_active=True)
+    queryset.update(is_active=True, updated_at=timezone.now())
+    # bulk updates skip the signals that invalidate the catalog cache
+    transaction.on_commit(bump_catalog_version)
 
 
 @admin.action(description='Disable selected products')
 def disable_products(modeladmin, request, queryset):
-    queryset.update(is_active=False)
+    queryset.update(is_active=False, updated_at=timezone.now())
+    # bulk updates skip the signals that invalidate the catalog cache
+    transaction.on_commit(bump_catalog_version)
 
 
 @admin.register(Product)
@@ -35,6 +69,51 @@ class ProductAdmin(admin.ModelAdmin):
     )
     inlines = [ProductImageInline]
     actions = [enable_products, disable_products]
+    change_list_template = 'admin/products/product/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_catalog_view),
+                name='products_product_import',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_catalog_view(self, request):
+        if not (is_superadmin(request.user) or is_seller(request.user)):
+            messages.error(request, 'You are not allowed to import catalogs.')
+            return redirect('admin:products_product_changelist')
+
+        form = CatalogImportForm(
+            request.POST or None, request.FILES or None, user=request.user
+        )
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            file_format = form.cleaned_data['file_format'] or detect_import_format(
+                upload.name
+            )
+            file_name = default_storage.save(
+                f'imports/{uuid.uuid4().hex}-{upload.name}', upload
+            )
+            import_catalog_task.delay_on_commit(
+                file_name, form.cleaned_data['store'].id, file_format
+            )
+            messages.success(
+                request, 'Catalog import has been queued and will run in the background.'
+            )
+            return redirect('admin:products_product_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import catalog',
+            'form': form,
+        }
+        return TemplateResponse(
+            request, 'admin/products/product/import_catalog.html', context
+        )
 
 
 @admin.register(Category)
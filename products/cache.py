@@ -0,0 +1,25 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def catalog_version():
+    """A stamp that changes whenever a category, product or product image does."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def catalog_cache_key(*parts, query=''):
+    # query strings are user-controlled, so keep them out of the key verbatim
+    digest = hashlib.md5(query.encode()).hexdigest() if query else ''
+    return ':'.join(['catalog', catalog_version(), *map(str, parts), digest])
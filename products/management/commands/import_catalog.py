@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services import (
+    DEFAULT_BATCH_SIZE,
+    IMPORT_FORMATS,
+    detect_import_format,
+    import_catalog,
+)
+from stores.models import Store
+
+
+class Command(BaseCommand):
+    help = 'Stream a CSV or NDJSON seller catalog into products and store items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the catalog file.')
+        parser.add_argument('--store', type=int, required=True, help='Target store id.')
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=[choice for choice, _ in IMPORT_FORMATS],
+            help='File format (detected from the extension by default).',
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            store = Store.objects.get(pk=options['store'])
+        except Store.DoesNotExist:
+            raise CommandError(f'Store {options["store"]} does not exist.')
+
+        path = options['path']
+        file_format = options['file_format'] or detect_import_format(path)
+
+        try:
+            with open(path, 'rb') as stream:
+                result = import_catalog(
+                    stream,
+                    store,
+                    file_format=file_format,
+                    batch_size=options['batch_size'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(error)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {result["rows"] - result["failed"]}/{result["rows"]} rows: '
+                f'{result["products_created"]} products, '
+                f'{result["store_items_created"]} store items, '
+                f'{result["store_items_updated"]} store items updated, '
+                f'{result["images_queued"]} images queued.'
+            )
+        )
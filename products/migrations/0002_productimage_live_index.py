@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productimage',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['product'], name='productimage_live_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_productimage_live_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('is_approved', True), ('is_deleted', False)), fields=['product'], name='comment_product_approved_idx'),
+        ),
+    ]
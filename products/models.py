@@ -28,6 +28,13 @@ class ProductImage(BaseModel):
     image = models.ImageField(upload_to='product/')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='image_product')
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['product'], condition=models.Q(is_deleted=False), name='productimage_live_idx'
+            ),
+        ]
+
 
 class Comment(BaseModel):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='comment_user')
@@ -35,6 +42,15 @@ class Comment(BaseModel):
     description = models.TextField()
     is_approved = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['product'],
+                condition=models.Q(is_deleted=False, is_approved=True),
+                name='comment_product_approved_idx',
+            ),
+        ]
+
     def __str__(self):
         return f'User: {self.user.first_name}, Product: {self.product.name}, Text: {self.text}'
     
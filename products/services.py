@@ -0,0 +1,279 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from stores.models import StoreItem
+
+from .cache import bump_catalog_version
+from .models import Category, Product
+from .tasks import download_product_images_task
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+IMPORT_FORMATS = [(CSV, 'CSV'), (NDJSON, 'NDJSON')]
+
+CATEGORY_PATH_SEPARATOR = '/'
+IMAGE_URL_SEPARATOR = '|'
+DEFAULT_BATCH_SIZE = 500
+IMAGES_PER_TASK = 10
+MAX_REPORTED_ERRORS = 50
+
+
+def detect_import_format(filename):
+    if filename.lower().endswith('.csv'):
+        return CSV
+    return NDJSON
+
+
+class CategoryResolver:
+    """Resolves category names or `Parent/Child` paths from one in-memory snapshot."""
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_path = {}
+
+        for category_id, name, parent_id in Category.objects.values_list(
+            'id', 'name', 'parent_id'
+        ).iterator():
+            self.by_id[category_id] = (name, parent_id)
+            # names shared by several categories are ambiguous and need a path
+            key = name.strip().lower()
+            self.by_name[key] = None if key in self.by_name else category_id
+
+        for category_id in self.by_id:
+            self.by_path[self._path_of(category_id)] = category_id
+
+    def _path_of(self, category_id):
+        parts = []
+        seen = set()
+        while category_id and category_id in self.by_id and category_id not in seen:
+            seen.add(category_id)
+            name, category_id = self.by_id[category_id]
+            parts.append(name.strip().lower())
+        return CATEGORY_PATH_SEPARATOR.join(reversed(parts))
+
+    def resolve(self, value):
+        value = str(value or '').strip()
+        if not value:
+            return None
+        if value.isdigit() and int(value) in self.by_id:
+            return int(value)
+
+        key = CATEGORY_PATH_SEPARATOR.join(
+            part.strip().lower() for part in value.split(CATEGORY_PATH_SEPARATOR)
+        )
+        if CATEGORY_PATH_SEPARATOR in key:
+            return self.by_path.get(key)
+        return self.by_name.get(key)
+
+
+def iter_catalog_rows(stream, file_format):
+    """Yields `(line_number, row)` pairs without reading the whole file."""
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if file_format == CSV:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def _to_decimal(value, default=None):
+    if value in (None, ''):
+        return default
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f'Invalid number: {value}')
+    if not number.is_finite():
+        raise ValueError(f'Invalid number: {value}')
+    return number
+
+
+def _to_price(value, default=None):
+    """A decimal that fits StoreItem.price, so bad values fail the row instead of the batch."""
+    price = _to_decimal(value, default)
+    if price is None:
+        return None
+    field = StoreItem._meta.get_field('price')
+    if abs(price) >= Decimal(10) ** (field.max_digits - field.decimal_places):
+        raise ValueError(f'Price is too large: {value}')
+    if price != price.quantize(Decimal(1).scaleb(-field.decimal_places)):
+        raise ValueError(f'Price has more than {field.decimal_places} decimal places: {value}')
+    return price
+
+
+def _to_bool(value, default=True):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def _image_urls(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(IMAGE_URL_SEPARATOR)
+    return [url.strip() for url in value if url and url.strip()]
+
+
+def parse_catalog_row(row, resolver):
+    if not isinstance(row, dict):
+        raise ValueError('Row is not a valid object.')
+
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError('Product name is required.')
+
+    category_id = resolver.resolve(row.get('category'))
+    if category_id is None:
+        raise ValueError(f'Unknown category: {row.get("category")}')
+
+    price = _to_price(row.get('price'))
+    if price is None or price < 0:
+        raise ValueError('A non-negative price is required.')
+
+    discount_price = _to_price(row.get('discount_price'), Decimal('0'))
+    if not 0 <= discount_price <= price:
+        raise ValueError('Discount price must be between 0 and the price.')
+    try:
+        stock = int(row.get('stock') or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid stock: {row.get("stock")}')
+    if stock < 0:
+        raise ValueError('Stock cannot be negative.')
+
+    return {
+        'name': name[:100],
+        'description': str(row.get('description') or ''),
+        'category_id': category_id,
+        'is_active': _to_bool(row.get('is_active')),
+        'price': price,
+        'discount_price': discount_price,
+        'stock': stock,
+        'images': _image_urls(row.get('images')),
+    }
+
+
+@transaction.atomic
+def _import_batch(batch, store):
+    # reuse products that already exist in the same category
+    existing = {}
+    for product_id, name, category_id in Product.objects.filter(
+        name__in={item['name'] for item in batch},
+        category_id__in={item['category_id'] for item in batch},
+    ).values_list('id', 'name', 'category_id'):
+        existing.setdefault((name, category_id), product_id)
+
+    new_products = {}
+    for item in batch:
+        key = (item['name'], item['category_id'])
+        if key not in existing and key not in new_products:
+            new_products[key] = Product(
+                name=item['name'],
+                description=item['description'],
+                category_id=item['category_id'],
+                is_active=item['is_active'],
+            )
+
+    created = Product.objects.bulk_create(new_products.values())
+    for product in created:
+        existing[(product.name, product.category_id)] = product.id
+
+    # a re-import updates the store's existing items instead of duplicating them
+    current = {
+        store_item.product_id: store_item
+        for store_item in StoreItem.objects.filter(
+            store=store, product_id__in={existing[(item['name'], item['category_id'])] for item in batch}
+        ).order_by('id')
+    }
+    new_store_items = {}
+    updated_store_items = {}
+    image_jobs = []
+    now = timezone.now()
+    for item in batch:
+        product_id = existing[(item['name'], item['category_id'])]
+        store_item = current.get(product_id) or new_store_items.get(product_id)
+        if store_item is None:
+            store_item = new_store_items[product_id] = StoreItem(store=store, product_id=product_id)
+        elif store_item.pk:
+            store_item.updated_at = now
+            updated_store_items[product_id] = store_item
+        store_item.price = item['price']
+        store_item.discount_price = item['discount_price']
+        store_item.stock = item['stock']
+        store_item.is_active = item['is_active']
+        image_jobs.extend([product_id, url] for url in item['images'])
+
+    StoreItem.objects.bulk_create(new_store_items.values())
+    StoreItem.objects.bulk_update(
+        updated_store_items.values(), ['price', 'discount_price', 'stock', 'is_active', 'updated_at']
+    )
+
+    for start in range(0, len(image_jobs), IMAGES_PER_TASK):
+        download_product_images_task.delay_on_commit(
+            image_jobs[start : start + IMAGES_PER_TASK]
+        )
+
+    return len(created), len(new_store_items), len(updated_store_items), len(image_jobs)
+
+
+def import_catalog(stream, store, file_format=NDJSON, batch_size=DEFAULT_BATCH_SIZE):
+    resolver = CategoryResolver()
+    result = {
+        'rows': 0,
+        'products_created': 0,
+        'store_items_created': 0,
+        'store_items_updated': 0,
+        'images_queued': 0,
+        'failed': 0,
+        'errors': [],
+    }
+
+    rows = iter_catalog_rows(stream, file_format)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+
+        batch = []
+        for line_number, row in chunk:
+            result['rows'] += 1
+            try:
+                batch.append(parse_catalog_row(row, resolver))
+            except ValueError as e:
+                result['failed'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append(f'Line {line_number}: {e}')
+
+        if batch:
+            products, store_items, updated, images = _import_batch(batch, store)
+            result['products_created'] += products
+            result['store_items_created'] += store_items
+            result['store_items_updated'] += updated
+            result['images_queued'] += images
+
+    if result['products_created'] or result['store_items_created'] or result['store_items_updated']:
+        # bulk inserts and updates skip the model signals
+        transaction.on_commit(bump_catalog_version)
+    return result
@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import bulk_purge, bulk_soft_delete, purging
+
+from .cache import bump_catalog_version
+from .models import Category, Product, ProductImage
+
+CATALOG_MODELS = (Category, Product, ProductImage)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(bulk_soft_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(bulk_soft_delete, sender=Product)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(bulk_soft_delete, sender=ProductImage)
+def invalidate_catalog_signal(sender, signal, **kwargs):
+    if signal is post_delete and purging.get():
+        # bumped once per batch by invalidate_catalog_after_purge
+        return
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(bulk_purge)
+def invalidate_catalog_after_purge(sender, deleted, **kwargs):
+    if any(deleted.get(model._meta.label) for model in CATALOG_MODELS):
+        transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_file(sender, instance, **kwargs):
+    # soft deletes keep the file; it goes once the row is really gone
+    if instance.image:
+        storage, name = instance.image.storage, instance.image.name
+        transaction.on_commit(lambda: storage.delete(name))
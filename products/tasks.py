@@ -0,0 +1,94 @@
+import ipaddress
+import os
+import socket
+from urllib.parse import urljoin, urlparse
+
+import requests
+from celery import shared_task
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .models import ProductImage
+
+IMAGE_DOWNLOAD_TIMEOUT = 5  # seconds
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_IMAGE_REDIRECTS = 3
+
+
+def is_public_url(url):
+    """True for http(s) URLs whose host resolves only to public addresses.
+
+    Image URLs come from uploaded catalogs, so this keeps the worker from
+    being pointed at loopback, private or link-local services.
+    """
+    parts = urlparse(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return False
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, parts.port or None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError):
+        return False
+    return all(ipaddress.ip_address(address[4][0]).is_global for address in addresses)
+
+
+def fetch_image(session, url):
+    """The image bytes, or None if the URL isn't public, fails or exceeds MAX_IMAGE_SIZE."""
+    for _ in range(MAX_IMAGE_REDIRECTS + 1):
+        if not is_public_url(url):
+            return None
+        # redirects are followed by hand so every hop is checked
+        with session.get(url, timeout=IMAGE_DOWNLOAD_TIMEOUT, stream=True, allow_redirects=False) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['Location'])
+                continue
+            response.raise_for_status()
+            if int(response.headers.get('Content-Length') or 0) > MAX_IMAGE_SIZE:
+                return None
+            content = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                content.extend(chunk)
+                if len(content) > MAX_IMAGE_SIZE:
+                    return None
+            return bytes(content)
+    return None
+
+
+@shared_task(ignore_result=True, soft_time_limit=110, time_limit=120)
+def download_product_images_task(image_jobs):
+    downloaded = 0
+    failed = 0
+
+    with requests.Session() as session:
+        for product_id, url in image_jobs:
+            try:
+                content = fetch_image(session, url)
+            except requests.exceptions.RequestException:
+                content = None
+            if content is None:
+                failed += 1
+                continue
+
+            filename = os.path.basename(urlparse(url).path) or f'{product_id}.jpg'
+            image = ProductImage(product_id=product_id)
+            image.image.save(filename, ContentFile(content), save=False)
+            image.save()
+            downloaded += 1
+
+    return {'downloaded': downloaded, 'failed': failed}
+
+
+@shared_task(soft_time_limit=3540, time_limit=3600)
+def import_catalog_task(file_name, store_id, file_format):
+    from stores.models import Store
+
+    from .services import import_catalog
+
+    try:
+        store = Store.objects.get(pk=store_id)
+        with default_storage.open(file_name, 'rb') as stream:
+            result = import_catalog(stream, store, file_format=file_format)
+    finally:
+        default_storage.delete(file_name)
+
+    result['errors'] = result['errors'][:10]
+    return result
@@ -1,3 +1,247 @@
+import io
+import json
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from products.cache import catalog_version
+from products.models import Category, Product, ProductImage
+from products.services import CSV, NDJSON, import_catalog
+from products.tasks import MAX_IMAGE_SIZE, download_product_images_task, import_catalog_task
+from stores.models import Store, StoreItem
+
+User = get_user_model()
+
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(email="seller@example.com", password="pass123", role="seller")
+        self.store = Store.objects.create(name="Owner Store", seller=self.seller)
+        self.drinks = Category.objects.create(name="Drinks", description="Desc")
+        self.hot = Category.objects.create(name="Hot", description="Desc", parent=self.drinks)
+        self.food = Category.objects.create(name="Food", description="Desc")
+        Category.objects.create(name="Hot", description="Desc", parent=self.food)
+
+    def ndjson(self, rows):
+        return io.BytesIO("\n".join(json.dumps(row) for row in rows).encode())
+
+    @patch("products.services.download_product_images_task")
+    def test_import_ndjson_resolves_category_paths(self, task):
+        stream = self.ndjson([
+            {"name": "Latte", "category": "Drinks/Hot", "price": "120.00", "stock": 3, "images": ["http://example.com/latte.png"]},
+            {"name": "Juice", "category": "drinks", "price": "80", "stock": 10},
+        ])
+
+        result = import_catalog(stream, self.store, file_format=NDJSON)
+
+        self.assertEqual(result["store_items_created"], 2)
+        self.assertEqual(result["failed"], 0)
+        self.assertEqual(Product.objects.get(name="Latte").category, self.hot)
+        self.assertEqual(StoreItem.objects.get(product__name="Juice").stock, 10)
+        task.delay_on_commit.assert_called_once()
+        self.assertEqual(result["images_queued"], 1)
+
+    @patch("products.services.download_product_images_task")
+    def test_import_csv_in_batches_reuses_existing_products(self, task):
+        Product.objects.create(name="Tea", description="", category=self.hot)
+        stream = io.BytesIO(
+            b"name,category,price,discount_price,stock\n"
+            b"Tea,Drinks/Hot,50,0,4\n"
+            b"Cake,Food,70,60,2\n"
+            b"Soup,Hot,30,0,1\n"
+        )
+
+        result = import_catalog(stream, self.store, file_format=CSV, batch_size=1)
+
+        self.assertEqual(result["rows"], 3)
+        self.assertEqual(result["products_created"], 1)
+        self.assertEqual(result["store_items_created"], 2)
+        self.assertEqual(result["failed"], 1)
+        self.assertIn("Line 4", result["errors"][0])
+        self.assertEqual(Product.objects.filter(name="Tea").count(), 1)
+        task.delay_on_commit.assert_not_called()
+
+    @patch("products.services.download_product_images_task")
+    def test_import_catalog_command(self, task):
+        catalog = tempfile.NamedTemporaryFile(suffix=".ndjson")
+        self.addCleanup(catalog.close)
+        catalog.write(self.ndjson([
+            {"name": "Mocha", "category": "Drinks/Hot", "price": "150", "stock": 1},
+        ]).getvalue())
+        catalog.flush()
+        out = io.StringIO()
+
+        call_command("import_catalog", catalog.name, store=self.store.id, stdout=out)
+
+        self.assertIn("Imported 1/1 rows", out.getvalue())
+        self.assertTrue(StoreItem.objects.filter(product__name="Mocha", store=self.store).exists())
+
+    @patch("products.services.download_product_images_task")
+    def test_reimport_updates_existing_store_items(self, task):
+        rows = [{"name": "Latte", "category": "Drinks/Hot", "price": "120", "stock": 3}]
+        import_catalog(self.ndjson(rows), self.store, file_format=NDJSON)
+        rows[0].update(price="110", stock=7)
+        version = catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_catalog(self.ndjson(rows * 2), self.store, file_format=NDJSON)
+
+        self.assertEqual(result["store_items_created"], 0)
+        self.assertEqual(result["store_items_updated"], 1)
+        self.assertNotEqual(catalog_version(), version)
+        store_item = StoreItem.objects.get(product__name="Latte", store=self.store)
+        self.assertEqual((store_item.price, store_item.stock), (110, 7))
+
+    @patch("products.services.download_product_images_task")
+    def test_out_of_range_prices_fail_only_their_row(self, task):
+        stream = self.ndjson([
+            {"name": "NaN", "category": "Food", "price": "NaN"},
+            {"name": "Infinite", "category": "Food", "price": "Infinity"},
+            {"name": "Huge", "category": "Food", "price": "123456789012"},
+            {"name": "Fractional", "category": "Food", "price": "1.005"},
+            {"name": "Negative discount", "category": "Food", "price": "10", "discount_price": "-3"},
+            {"name": "Big discount", "category": "Food", "price": "10", "discount_price": "12"},
+            {"name": "Bread", "category": "Food", "price": "99999999.99", "discount_price": "5"},
+        ])
+
+        result = import_catalog(stream, self.store, file_format=NDJSON)
+
+        self.assertEqual(result["failed"], 6)
+        self.assertEqual(result["store_items_created"], 1)
+        self.assertEqual(len(result["errors"]), 6)
+        self.assertEqual(list(Product.objects.values_list("name", flat=True)), ["Bread"])
+
+    def test_import_task_deletes_the_upload_when_the_store_is_gone(self):
+        with patch("products.tasks.default_storage") as storage:
+            with self.assertRaises(Store.DoesNotExist):
+                import_catalog_task("imports/catalog.ndjson", 0, NDJSON)
+        storage.delete.assert_called_once_with("imports/catalog.ndjson")
+
+
+class ImageDownloadTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Phones", description="Desc")
+        self.product = Product.objects.create(name="Phone", category=category)
+
+    def resolve_to(self, address):
+        return patch("products.tasks.socket.getaddrinfo", return_value=[(None, None, None, "", (address, 80))])
+
+    def test_private_and_non_http_urls_are_not_fetched(self):
+        with self.resolve_to("127.0.0.1"), patch("products.tasks.requests.Session.get") as get:
+            result = download_product_images_task([
+                [self.product.id, "http://internal.example/a.png"],
+                [self.product.id, "file:///etc/passwd"],
+            ])
+
+        get.assert_not_called()
+        self.assertEqual(result, {"downloaded": 0, "failed": 2})
+
+    def test_oversized_images_stop_downloading_at_the_limit(self):
+        response = MagicMock(is_redirect=False, headers={})
+        response.__enter__.return_value = response
+        chunks = iter([b"x" * MAX_IMAGE_SIZE, b"x", b"never read"])
+        response.iter_content.return_value = chunks
+
+        with self.resolve_to("93.184.216.34"), patch("products.tasks.requests.Session.get", return_value=response):
+            result = download_product_images_task([[self.product.id, "http://cdn.example/big.png"]])
+
+        self.assertEqual(result, {"downloaded": 0, "failed": 1})
+        self.assertEqual(next(chunks), b"never read")
+        self.assertFalse(ProductImage.objects.exists())
+
+    def test_redirects_to_private_hosts_are_refused(self):
+        redirect = MagicMock(is_redirect=True, headers={"Location": "http://10.0.0.1/a.png"})
+        redirect.__enter__.return_value = redirect
+        addresses = {"cdn.example": "93.184.216.34", "10.0.0.1": "10.0.0.1"}
+
+        def getaddrinfo(host, *args, **kwargs):
+            return [(None, None, None, "", (addresses[host], 80))]
+
+        with patch("products.tasks.socket.getaddrinfo", getaddrinfo), patch(
+            "products.tasks.requests.Session.get", return_value=redirect
+        ) as get:
+            result = download_product_images_task([[self.product.id, "http://cdn.example/a.png"]])
+
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(result, {"downloaded": 0, "failed": 1})
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Phones", description="Desc")
+        self.product = Product.objects.create(name="Phone", category=self.category)
+        ProductImage.objects.create(product=self.product, image="product/a.png")
+
+    def test_repeated_reads_come_from_the_cache(self):
+        url = reverse("product-list")
+        first = self.client.get(url, {"search": "Phone", "page": 1})
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, {"page": 1, "search": "Phone"})
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(first.data, second.data)
+
+    def test_catalog_changes_invalidate(self):
+        url = reverse("product-detail", args=[self.product.id])
+        self.client.get(url)
+        version = catalog_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Smartphones"
+            self.category.save()
+
+        self.assertNotEqual(catalog_version(), version)
+        self.assertEqual(self.client.get(url).data["category_name"], "Smartphones")
+
+    def test_bulk_soft_delete_and_restore_invalidate(self):
+        url = reverse("product-list")
+        self.assertEqual(self.client.get(url).data["count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).delete()
+        self.assertEqual(self.client.get(url).data["count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.all_objects().filter(pk=self.product.pk).restore()
+        self.assertEqual(self.client.get(url).data["count"], 1)
+
+    def test_product_list_is_constant_in_queries(self):
+        for number in range(3):
+            product = Product.objects.create(name=f"Phone {number}", category=self.category)
+            ProductImage.objects.create(product=product, image="product/b.png")
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("product-list"))
+
+        self.assertEqual(response.data["count"], 4)
+        # ETag aggregate, count, page and the image prefetch
+        self.assertLessEqual(len(queries), 4)
+
+    def test_conditional_requests_get_304_without_queries(self):
+        url = reverse("product-list")
+        response = self.client.get(url)
+        etag = response.headers["ETag"]
+        self.assertIn("public", response.headers["Cache-Control"])
+        self.assertIn("Last-Modified", response.headers)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Renamed"
+            self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
@@ -1,5 +1,17 @@
+from django.conf import settings
 from rest_framework import viewsets
 from rest_framework import permissions
+from rest_framework.response import Response
+from core.cache import get_or_compute
+from core.conditional import (
+    ConditionalGetMixin,
+    canonical_query,
+    make_etag,
+    not_modified,
+    set_validators,
+)
+
+from .cache import catalog_cache_key
 from .models import  Category, Product, ProductImage
 from .serializers import CategorySerializer, ProductSerializer, ProductImageSerializer
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -7,14 +19,48 @@ from django_filters.rest_framework import DjangoFilterBackend
 from .filters import ProductFilter
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogCacheMixin(ConditionalGetMixin):
+    """Serves list and retrieve from `catalog:` cache keys, with ETag and Last-Modified.
+
+    The keys embed the catalog version, which products.signals bumps on
+    any category, product or image change, so stale entries are never read.
+    A cold key is rendered by one request while concurrent ones wait for it.
+    The validators are stored with the body, so a 304 needs no query.
+    """
+
+    def get_cache_control(self):
+        return {'public': True, 'max_age': settings.CATALOG_HTTP_MAX_AGE}
+
+    def conditional_response(self, render, request, *args, **kwargs):
+        key = catalog_cache_key(self.basename, self.action, kwargs.get('pk', ''), query=canonical_query(request))
+        response = None
+
+        def render_entry():
+            nonlocal response
+            etag, last_modified = self.get_validators(request, *args, **kwargs)
+            response = render(request, *args, **kwargs)
+            if response.status_code != 200:
+                return None
+            # the key carries the catalog version, which also covers nested changes
+            return {'etag': make_etag(key, etag), 'last_modified': last_modified, 'data': response.data}
+
+        entry = get_or_compute(key, render_entry, timeout=settings.CATALOG_CACHE_SECONDS)
+        if entry is None:
+            return response
+        response = not_modified(request, entry['etag'], entry['last_modified']) or response or Response(entry['data'])
+        return set_validators(response, entry['etag'], entry['last_modified'], self.get_cache_control())
+
+
+class CategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
+    last_modified_fields = ('updated_at', 'children__updated_at')
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+class ProductViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    queryset = Product.objects.select_related('category').prefetch_related('image_product')
     serializer_class = ProductSerializer
+    last_modified_fields = ('updated_at', 'category__updated_at', 'image_product__updated_at')
     filter_backends = [SearchFilter, DjangoFilterBackend, OrderingFilter]
     search_fields = ['name','description']
     filterset_class = ProductFilter
@@ -30,9 +76,10 @@ class ProductViewSet(viewsets.ModelViewSet):
         return [permission() for permission in permission_classes]
         
 
-class ProductImageViewSet(viewsets.ModelViewSet):
-    queryset = ProductImage.objects.all()
+class ProductImageViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    queryset = ProductImage.objects.select_related('product')
     serializer_class = ProductImageSerializer
+    last_modified_fields = ('updated_at', 'product__updated_at')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -67,12 +67,12 @@ class StoreAdmin(admin.ModelAdmin):
 
 @admin.action(description='Enable selected store items')
 def enable_store_items(modeladmin, request, queryset):
-    queryset.update(is_active=True)
+    queryset.update(is_active=True, updated_at=timezone.now())
 
 
 @admin.action(description='Disable selected store items')
 def disable_store_items(modeladmin, request, queryset):
-    queryset.update(is_active=False)
+    queryset.update(is_active=False, updated_at=timezone.now())
 
 
 @admin.register(StoreItem)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_productimage_live_index'),
+        ('stores', '0003_rename_store_storeitem_store'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storeitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['product', 'store'], name='storeitem_live_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storeitem',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['store'], name='storeitem_live_store_idx'),
+        ),
+    ]
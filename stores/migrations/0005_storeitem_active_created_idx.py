@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_comment_product_approved_idx'),
+        ('stores', '0004_storeitem_live_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storeitem',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_deleted', False)), fields=['-created_at'], name='storeitem_active_created_idx'),
+        ),
+    ]
@@ -21,6 +21,23 @@ class StoreItem(BaseModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='storeitem_product')
     store = models.ForeignKey(Store, on_delete=models.CASCADE, related_name='storeitem_store')
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['product', 'store'],
+                condition=models.Q(is_deleted=False),
+                name='storeitem_live_product_idx',
+            ),
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(is_deleted=False, is_active=True),
+                name='storeitem_active_created_idx',
+            ),
+            models.Index(
+                fields=['store'], condition=models.Q(is_deleted=False), name='storeitem_live_store_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.product.name} ({self.store.name})"
 
@@ -61,3 +61,19 @@ class StoreItemTests(APITestCase):
 
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_item_reads_answer_conditional_requests(self):
+        item = StoreItem.objects.create(store=self.store, product=self.product, price=10, stock=5)
+        url = reverse("mystore_items-detail", args=[item.id])
+        response = self.client.get(url)
+        etag = response.headers["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        list_etag = self.client.get(reverse("mystore_items-list")).headers["ETag"]
+        self.assertNotEqual(list_etag, etag)
+
+        self.client.patch(url, {"stock": 4}, format="json")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["stock"], 4)
@@ -6,6 +6,7 @@ from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from accounts.models import Address
+from core.conditional import ConditionalGetMixin
 
 from .filters import StoreItemFilter
 from .models import SellerRequest, Store, StoreItem
@@ -74,9 +75,12 @@ class StoreApiViewSet(viewsets.ModelViewSet):
         serializer.save(seller=user)
 
 
-class StoreItemApiViewSet(viewsets.ModelViewSet):
+class StoreItemApiViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = StoreItemSerializer
     queryset = StoreItem.objects.all()
+    last_modified_fields = ('updated_at', 'product__updated_at', 'store__updated_at')
+    # stock moves with every checkout, so shared caches must revalidate each time
+    cache_control = {'public': True, 'no_cache': True}
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,